@@ -0,0 +1,180 @@
+"""
+Asynchronous HTTP/2 OpenRouter Client
+Author: eddy
+
+Optional asyncio transport built on httpx (pip install "httpx[http2]"). All requests
+from one event loop share a single HTTP/2 connection per endpoint. The rate limiter
+and retry policy are shared with the pooled sync client, so both paths respect the
+same global limits.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+import weakref
+from typing import Optional
+
+import requests
+
+try:
+    from .config import OPENROUTER_CONFIG, USER_AGENT, PROXY_CONFIG, ASYNC_CONFIG
+    from .client import get_client, estimate_request_tokens
+    from .ratelimit import parse_retry_after
+    from .breaker import record_attempt, allow_retry
+except ImportError:
+    from config import OPENROUTER_CONFIG, USER_AGENT, PROXY_CONFIG, ASYNC_CONFIG
+    from client import get_client, estimate_request_tokens
+    from ratelimit import parse_retry_after
+    from breaker import record_attempt, allow_retry
+
+
+def async_transport_available() -> bool:
+    """
+    Whether httpx is installed for the asyncio path
+    """
+    return importlib.util.find_spec("httpx") is not None
+
+
+class AsyncOpenRouterClient:
+    """Event-loop bound httpx client sharing the sync client's limiter and retry policy"""
+
+    def __init__(self, base_url: str, connect_timeout: float, read_timeout: float, max_connections: int,
+                 http2: bool = True, proxy: Optional[str] = None, user_agent: str = ""):
+        import httpx
+
+        self._httpx = httpx
+        sync_client = get_client()
+        self.base_url = base_url.rstrip("/")
+        self.limiter = sync_client.limiter
+        self.retry_policy = sync_client.retry_policy
+        # HTTP/2 needs the h2 package; without it httpx falls back to HTTP/1.1 keep-alive
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+
+        headers = {
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://comfyui.local",
+            "X-Title": "ComfyUI MMAudio Description Generator",
+        }
+        if user_agent:
+            headers["User-Agent"] = user_agent
+        self.session = httpx.AsyncClient(
+            http2=self.http2,
+            headers=headers,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections),
+            proxy=proxy,
+        )
+
+    async def post_chat(self, payload: dict, api_key: str, base_url: Optional[str] = None,
+                        retry: bool = True, breaker=None):
+        """
+        Async counterpart of OpenRouterClient.post_chat for non-streaming requests.
+        httpx transport errors are raised as the equivalent requests exceptions, and the
+        response carries .timings and .retries like the sync client's responses.
+        """
+        retry_count = self.retry_policy.retry_count if retry else 0
+        attempt = 0
+        backoff = 0.0
+        while True:
+            try:
+                response = await self._send_limited(payload, api_key, base_url)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                record_attempt(breaker, None)
+                if attempt >= retry_count or not allow_retry(breaker):
+                    e.retries = attempt
+                    e.timings = dict(getattr(e, "timings", None) or {}, backoff=backoff)
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logging.warning(f"OpenRouter request failed ({e}), retry {attempt + 1} in {delay:.2f}s")
+            else:
+                record_attempt(breaker, response.status_code)
+                if (not self.retry_policy.is_retryable_status(response.status_code) or attempt >= retry_count
+                        or not allow_retry(breaker)):
+                    response.retries = attempt
+                    response.timings["backoff"] = backoff
+                    return response
+                delay = self.retry_policy.delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+                logging.warning(f"OpenRouter returned {response.status_code}, retry {attempt + 1} in {delay:.2f}s")
+
+            await asyncio.sleep(delay)
+            backoff += delay
+            attempt += 1
+
+    async def _send_limited(self, payload: dict, api_key: str, base_url: Optional[str] = None):
+        timings = {"queue": 0.0}
+        if self.limiter is not None:
+            queued = time.perf_counter()
+            # The limiter blocks on a condition variable, so wait for it off the event loop
+            await asyncio.to_thread(self.limiter.acquire, estimate_request_tokens(payload))
+            timings["queue"] = time.perf_counter() - queued
+
+        success, rate_limited, retry_after = False, False, None
+        try:
+            started = time.perf_counter()
+            response = await self._send(payload, api_key, base_url, timings, started)
+            success = response.status_code < 400
+            if response.status_code == 429:
+                rate_limited = True
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            response.timings = timings
+            return response
+        except Exception as e:
+            e.timings = timings
+            raise
+        finally:
+            if self.limiter is not None:
+                self.limiter.release(success, rate_limited, retry_after)
+
+    async def _send(self, payload: dict, api_key: str, base_url: Optional[str], timings: dict, started: float):
+        httpx = self._httpx
+        request = self.session.build_request(
+            "POST",
+            f"{(base_url or self.base_url).rstrip('/')}/chat/completions",
+            headers={"Authorization": f"Bearer {api_key.strip()}"},
+            json=payload,
+        )
+        try:
+            response = await self.session.send(request, stream=True)
+            # Time from sending the request until the response headers arrived
+            timings["ttfb"] = time.perf_counter() - started
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        return response
+
+    async def aclose(self) -> None:
+        await self.session.aclose()
+
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenRouterClient]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def get_async_client() -> AsyncOpenRouterClient:
+    """
+    Return the async client of the running event loop, creating it on first use
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(loop)
+            if client is None:
+                client = AsyncOpenRouterClient(
+                    OPENROUTER_CONFIG["base_url"],
+                    OPENROUTER_CONFIG["connect_timeout"],
+                    OPENROUTER_CONFIG["timeout"],
+                    ASYNC_CONFIG["max_connections"],
+                    http2=ASYNC_CONFIG["http2"],
+                    proxy=PROXY_CONFIG.get("https") or PROXY_CONFIG.get("http"),
+                    user_agent=USER_AGENT,
+                )
+                _clients[loop] = client
+    return client
@@ -0,0 +1,57 @@
+"""
+Batch Processing Helpers
+Author: eddy
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+def split_items(text: str, delimiter: str = "") -> List[str]:
+    """
+    Split input into stripped, non-blank items by line or by a custom delimiter
+    """
+    parts = text.split(delimiter) if delimiter else text.splitlines()
+    return [part.strip() for part in parts if part.strip()]
+
+
+def run_batch(items: List[str], worker: Callable[[str], str], concurrency: int) -> List[str]:
+    """
+    Run worker over items with a bounded thread pool, returning results in input order.
+    Duplicate items are dispatched once and share the same result.
+    """
+    unique_items = list(dict.fromkeys(items))
+    if not unique_items:
+        return []
+
+    results: Dict[str, str] = {}
+    max_workers = max(1, min(concurrency, len(unique_items)))
+
+    if max_workers == 1:
+        for item in unique_items:
+            results[item] = worker(item)
+    else:
+        # Each worker runs in a copy of the caller's context so context variables carry over
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mmaudio-batch") as executor:
+            for item, result in zip(unique_items, executor.map(lambda item: context.copy().run(worker, item), unique_items)):
+                results[item] = result
+
+    return [results[item] for item in items]
+
+
+def iter_ordered(items: List[str], worker: Callable[[str], object], concurrency: int) -> Iterator[Tuple[int, object]]:
+    """
+    Run worker over items concurrently and yield (index, result) in input order,
+    each as soon as it and every earlier item have finished
+    """
+    if not items:
+        return
+
+    context = contextvars.copy_context()
+    max_workers = max(1, min(concurrency, len(items)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mmaudio-batch") as executor:
+        futures = [executor.submit(context.copy().run, worker, item) for item in items]
+        for index, future in enumerate(futures):
+            yield index, future.result()
@@ -0,0 +1,120 @@
+"""
+Package Import Cost Benchmark
+Author: eddy
+
+Imports the node package the way ComfyUI loads custom nodes, each time in a fresh
+interpreter, and reports the startup time, memory and modules it adds over a bare
+interpreter. Exits non-zero when a budget is exceeded or when a module that should
+only load on first use (network stack, stores) is imported up front.
+
+Usage:
+    python benchmarks/import_time.py --runs 15 --max-ms 60 --max-mb 8
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay unloaded until a node actually runs
+DEFERRED_MODULES = ["requests", "urllib3", "httpx", "asyncio", "sqlite3", "http.server"]
+
+PROBE = r"""
+import importlib.util, json, os, resource, sys, time, tracemalloc
+
+package_dir, load, trace = sys.argv[1], sys.argv[2] == "1", sys.argv[3] == "1"
+before = set(sys.modules)
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if trace:
+    tracemalloc.start()
+started = time.perf_counter()
+if load:
+    spec = importlib.util.spec_from_file_location(
+        "mmaudio_nodes", os.path.join(package_dir, "__init__.py"),
+        submodule_search_locations=[package_dir])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+elapsed = time.perf_counter() - started
+peak = tracemalloc.get_traced_memory()[1] if trace else 0
+print(json.dumps({
+    "ms": elapsed * 1000.0,
+    "peak_mb": peak / (1024 * 1024),
+    "rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+    "modules": sorted(set(sys.modules) - before),
+}))
+"""
+
+
+def run_probe(load: bool, trace: bool = False) -> Dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, PACKAGE_DIR, "1" if load else "0", "1" if trace else "0"],
+        capture_output=True, text=True, check=True, cwd=PACKAGE_DIR,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(runs: int) -> Dict:
+    """
+    Median import cost over several fresh interpreters, minus a bare interpreter run
+    """
+    baseline: List[Dict] = [run_probe(False) for _ in range(runs)]
+    loaded: List[Dict] = [run_probe(True) for _ in range(runs)]
+    # tracemalloc slows imports down a lot, so allocations are measured in separate runs
+    traced: List[Dict] = [run_probe(True, trace=True) for _ in range(max(1, runs // 3))]
+    base_ms = statistics.median(sample["ms"] for sample in baseline)
+    modules = sorted(set(loaded[0]["modules"]) - set(baseline[0]["modules"]))
+    return {
+        "runs": runs,
+        "import_ms": statistics.median(sample["ms"] for sample in loaded) - base_ms,
+        "import_ms_min": min(sample["ms"] for sample in loaded) - base_ms,
+        "peak_python_mb": statistics.median(sample["peak_mb"] for sample in traced),
+        "rss_mb": statistics.median(sample["rss_mb"] for sample in loaded),
+        "added_modules": len(modules),
+        "deferred_loaded": [name for name in DEFERRED_MODULES if name in modules],
+        "modules": modules,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the startup cost of importing the MMAudio node package")
+    parser.add_argument("--runs", type=int, default=15, help="Fresh interpreters per measurement")
+    parser.add_argument("--max-ms", type=float, default=60.0, help="Fail above this median import time")
+    parser.add_argument("--max-mb", type=float, default=8.0, help="Fail above this Python peak allocation")
+    parser.add_argument("--show-modules", action="store_true", help="List every module the import adds")
+    parser.add_argument("--json", default="", help="Also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    result = measure(max(1, args.runs))
+
+    print(f"{'import ms (median)':<24}{result['import_ms']:>10.1f}")
+    print(f"{'import ms (min)':<24}{result['import_ms_min']:>10.1f}")
+    print(f"{'python peak MB':<24}{result['peak_python_mb']:>10.2f}")
+    print(f"{'RSS growth MB':<24}{result['rss_mb']:>10.2f}")
+    print(f"{'modules added':<24}{result['added_modules']:>10}")
+    if args.show_modules:
+        print("\n" + "\n".join(result["modules"]))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2)
+
+    failures = []
+    if result["import_ms"] > args.max_ms:
+        failures.append(f"import time {result['import_ms']:.1f} ms exceeds {args.max_ms:.1f} ms")
+    if result["peak_python_mb"] > args.max_mb:
+        failures.append(f"peak allocation {result['peak_python_mb']:.2f} MB exceeds {args.max_mb:.2f} MB")
+    if result["deferred_loaded"]:
+        failures.append(f"loaded at import time: {', '.join(result['deferred_loaded'])}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
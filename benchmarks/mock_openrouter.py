@@ -0,0 +1,203 @@
+"""
+Local Mock OpenRouter Server
+Author: eddy
+
+Stand-in for /api/v1/chat/completions with configurable latency, error and
+rate-limit injection, optional SSE streaming and packed (JSON array) answers.
+
+Usage:
+    python benchmarks/mock_openrouter.py --port 8765 --latency lognormal:0.4:0.5 --error-rate 0.01
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+DESCRIPTIONS = [
+    "Peaceful piano melody with soft dynamics and gentle rhythm",
+    "Gentle rain sounds with distant thunder creating relaxation",
+    "Warm female voice speaking softly with friendly tone",
+    "Coffee shop ambience with gentle chatter and background music",
+    "Footsteps echoing on wooden floor",
+]
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Build a latency sampler from "constant:S", "uniform:MIN:MAX" or "lognormal:MEDIAN:SIGMA" (seconds)
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(":") if value]
+    if kind == "constant":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        import math
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class MockState:
+    """Behaviour knobs and counters shared by all handler threads"""
+
+    def __init__(self, latency: Callable[[], float], error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 retry_after: float = 1.0, stream_delay: float = 0.01):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.stream_delay = stream_delay
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests = self.errors = self.rate_limited = 0
+
+
+def _answer_for(user_content: str) -> str:
+    """
+    Deterministic description for an input; packed prompts get a JSON array back
+    """
+    if "Input items:" in user_content:
+        try:
+            items = json.loads(user_content.split("Input items:", 1)[1].strip())
+            return json.dumps([
+                {"id": item["id"], "description": DESCRIPTIONS[hash(item["input"]) % len(DESCRIPTIONS)]}
+                for item in items
+            ])
+        except (ValueError, KeyError, TypeError):
+            pass
+    return DESCRIPTIONS[hash(user_content) % len(DESCRIPTIONS)]
+
+
+def make_handler(state: MockState):
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: dict, headers: Optional[dict] = None) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": {"message": "Invalid JSON"}})
+                return
+
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "Not found"}})
+                return
+
+            state.count("requests")
+            roll = random.random()
+            if roll < state.rate_limit_rate:
+                state.count("rate_limited")
+                self._send_json(429, {"error": {"message": "Rate limit exceeded"}},
+                                {"Retry-After": str(state.retry_after)})
+                return
+            if roll < state.rate_limit_rate + state.error_rate:
+                state.count("errors")
+                self._send_json(500, {"error": {"message": "Injected upstream error"}})
+                return
+
+            time.sleep(max(0.0, state.latency()))
+
+            content = request.get("messages", [{}])[-1].get("content", "")
+            if isinstance(content, list):
+                content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+            answer = _answer_for(content)
+            usage = {"prompt_tokens": sum(len(json.dumps(m)) // 3 for m in request.get("messages", [])),
+                     "completion_tokens": len(answer.split()) + 1}
+
+            if request.get("stream"):
+                self._stream(answer, usage)
+            else:
+                self._send_json(200, {
+                    "id": "mock-completion",
+                    "model": request.get("model", "mock"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+        def _stream(self, answer: str, usage: dict) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            try:
+                self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+                for word in answer.split(" "):
+                    chunk = {"choices": [{"index": 0, "delta": {"content": word + " "}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(state.stream_delay)
+                self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading early, which is the point of streaming cut-off
+                pass
+
+    return MockHandler
+
+
+def start_mock_server(state: MockState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Start the mock server on a background thread; port 0 picks a free port
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-openrouter", daemon=True).start()
+    return server
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Local mock OpenRouter chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:0.4:0.5",
+                        help="constant:S, uniform:MIN:MAX or lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429")
+    parser.add_argument("--stream-delay", type=float, default=0.01, help="Delay between streamed words")
+    args = parser.parse_args(argv)
+
+    state = MockState(parse_latency(args.latency), args.error_rate, args.rate_limit_rate,
+                      args.retry_after, args.stream_delay)
+    server = start_mock_server(state, args.host, args.port)
+    print(f"Mock OpenRouter listening on http://{args.host}:{server.server_port}/api/v1 (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
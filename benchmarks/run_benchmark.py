@@ -0,0 +1,173 @@
+"""
+Node Throughput and Latency Benchmark
+Author: eddy
+
+Drives every generator node through the mock OpenRouter server (or any
+OpenAI-compatible endpoint) at several concurrency levels and reports
+p50/p95/p99 latency, requests per second, cache hit rate and peak memory.
+
+Usage:
+    python benchmarks/run_benchmark.py --requests 200 --concurrency 1,4,16
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PACKAGE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config  # noqa: E402
+from mock_openrouter import MockState, parse_latency, start_mock_server  # noqa: E402
+
+PROMPTS = [
+    "钢琴音乐", "下雨声", "女性说话", "咖啡厅环境", "森林里的鸟叫",
+    "东方女性穿着旗袍走在中式楼梯上，地板发出高跟鞋的声音",
+    "海浪拍打沙滩，远处有海鸥", "夜晚的城市街道，车流声", "壁炉里的火噼啪作响",
+    "紧张的悬疑配乐", "男性解说员平静地讲述", "键盘打字声和时钟滴答声",
+]
+
+
+def percentile(samples: List[float], value: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(value / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def node_workloads(nodes, api_key: str, stream_preview: bool) -> Dict[str, Callable[[str], object]]:
+    """
+    One callable per node class taking a prompt and running the node once
+    """
+    return {
+        "StringMultilineTranslator": lambda text: nodes.StringMultilineTranslator().execute(
+            text, api_key, "音频描述", True),
+        "StringConcatenateTranslator": lambda text: nodes.StringConcatenateTranslator().execute(
+            text, "轻柔的背景音乐", api_key, " with ", True, "音频描述"),
+        "StringReplaceTranslator": lambda text: nodes.StringReplaceTranslator().execute(
+            text, "声", "的声音", api_key, True, "音频描述"),
+        "WanVideoToMMAudioBridge": lambda text: nodes.WanVideoToMMAudioBridge().bridge_to_mmaudio(
+            {"prompt": text}, api_key, "音频描述", True),
+        "MMAudioPreviewGenerator": lambda text: nodes.MMAudioPreviewGenerator().preview_generate(
+            text, api_key, "音频描述", True, stream_preview=stream_preview),
+    }
+
+
+def reset_caches(cache_dir: str, run_name: str) -> None:
+    """
+    Point the response cache at a fresh file and drop in-memory indexes so runs are independent
+    """
+    import cache
+    import similarity
+
+    config.TRANSLATOR_CONFIG["cache_path"] = os.path.join(cache_dir, f"{run_name}.sqlite3")
+    cache._cache_instance = None
+    similarity._index_instance = None
+
+
+def run_case(name: str, workload: Callable[[str], object], prompts: List[str], concurrency: int,
+             state: MockState) -> dict:
+    latencies: List[float] = []
+
+    def timed(text: str) -> None:
+        started = time.perf_counter()
+        workload(text)
+        latencies.append(time.perf_counter() - started)
+
+    state.reset_counters()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, prompts))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    upstream = state.requests
+    return {
+        "node": name,
+        "concurrency": concurrency,
+        "calls": len(prompts),
+        "upstream_requests": upstream,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "rps": len(prompts) / elapsed if elapsed else 0.0,
+        "cache_hit_rate": max(0.0, 1 - upstream / len(prompts)) if prompts else 0.0,
+        "peak_python_mb": peak / (1024 * 1024),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the MMAudio description nodes against a mock API")
+    parser.add_argument("--requests", type=int, default=200, help="Node executions per case")
+    parser.add_argument("--unique", type=int, default=len(PROMPTS), help="Distinct prompts in the workload")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma separated concurrency levels")
+    parser.add_argument("--nodes", default="", help="Comma separated node names (default: all)")
+    parser.add_argument("--latency", default="lognormal:0.2:0.5", help="Mock latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--rps", type=float, default=0.0, help="Client rate limit (0 disables it)")
+    parser.add_argument("--stream", action="store_true", help="Stream the preview node")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache and similarity index")
+    parser.add_argument("--json", default="", help="Also write results to this JSON file")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    state = MockState(parse_latency(args.latency), args.error_rate, args.rate_limit_rate, retry_after=0.2)
+    server = start_mock_server(state)
+
+    config.OPENROUTER_CONFIG["base_url"] = f"http://127.0.0.1:{server.server_port}/api/v1"
+    config.RATE_LIMIT_CONFIG["requests_per_second"] = args.rps
+    config.RATE_LIMIT_CONFIG["max_concurrency"] = max(int(level) for level in args.concurrency.split(","))
+    config.TRANSLATOR_CONFIG["retry_backoff_base"] = 0.05
+    if args.no_cache:
+        config.TRANSLATOR_CONFIG["enable_cache"] = False
+        config.SIMILARITY_CONFIG["enabled"] = False
+
+    import nodes
+
+    pool = (PROMPTS * (args.unique // len(PROMPTS) + 1))[:args.unique]
+    pool = [text if i < len(PROMPTS) else f"{text} #{i}" for i, text in enumerate(pool)]
+    prompts = [random.choice(pool) for _ in range(args.requests)]
+
+    workloads = node_workloads(nodes, "sk-or-v1-benchmark", args.stream)
+    selected = [name.strip() for name in args.nodes.split(",") if name.strip()] or list(workloads)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="mmaudio-bench-") as cache_dir:
+        for name in selected:
+            for level in (int(level) for level in args.concurrency.split(",")):
+                reset_caches(cache_dir, f"{name}-{level}")
+                results.append(run_case(name, workloads[name], prompts, level, state))
+
+    server.shutdown()
+
+    header = f"{'node':<30}{'conc':>5}{'calls':>7}{'upstream':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rps':>9}{'hit %':>7}{'peak MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(f"{row['node']:<30}{row['concurrency']:>5}{row['calls']:>7}{row['upstream_requests']:>9}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['rps']:>9.1f}"
+              f"{row['cache_hit_rate'] * 100:>7.1f}{row['peak_python_mb']:>9.2f}")
+    print(f"\nProcess peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
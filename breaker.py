@@ -0,0 +1,144 @@
+"""
+Per-endpoint Circuit Breaker
+Author: eddy
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    from .config import CIRCUIT_BREAKER_CONFIG
+    from .metrics import record_circuit_state
+except ImportError:
+    from config import CIRCUIT_BREAKER_CONFIG
+    from metrics import record_circuit_state
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Status codes that indicate the endpoint itself is failing (429 only means it is busy)
+OUTAGE_STATUS_CODES = frozenset({408, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while every candidate endpoint's circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failures and rejects calls until open_duration has passed,
+    then lets a single probe through: success closes the circuit, failure reopens it
+    """
+
+    def __init__(self, name: str, failure_threshold: int, open_duration: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_duration = open_duration
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Whether a request may be sent now; in half-open state only the probe is allowed
+        """
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return True
+            if self.state == STATE_OPEN:
+                if time.monotonic() - self._opened_at < self.open_duration:
+                    return False
+                self._transition(STATE_HALF_OPEN)
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != STATE_CLOSED:
+                self._transition(STATE_CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == STATE_HALF_OPEN or (self.state == STATE_CLOSED and self.failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._transition(STATE_OPEN)
+
+    def abandon(self) -> None:
+        """
+        The allowed call ended without an outcome; let the next caller probe instead
+        """
+        with self._lock:
+            self._probing = False
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self.state != STATE_OPEN:
+                return 0.0
+            return max(0.0, self.open_duration - (time.monotonic() - self._opened_at))
+
+    def _transition(self, state: str) -> None:
+        previous, self.state = self.state, state
+        if state == STATE_OPEN:
+            logging.warning(f"Circuit for {self.name} opened after {self.failures} failures, "
+                            f"failing fast for {self.open_duration:.0f}s")
+        elif state == STATE_HALF_OPEN:
+            logging.info(f"Circuit for {self.name} half-open, sending a probe request")
+        else:
+            logging.info(f"Circuit for {self.name} closed (was {previous})")
+        record_circuit_state(self.name, state)
+
+
+def record_attempt(breaker: Optional[CircuitBreaker], status_code: Optional[int]) -> None:
+    """
+    Count one request attempt on an endpoint's breaker; status_code None is a network error
+    """
+    if breaker is None:
+        return
+    if status_code is None or status_code in OUTAGE_STATUS_CODES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def allow_retry(breaker: Optional[CircuitBreaker]) -> bool:
+    """
+    Whether a retry may be sent; only ask right before sending, as a half-open breaker
+    hands out its single probe here
+    """
+    return breaker is None or breaker.allow()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(endpoint: str) -> Optional[CircuitBreaker]:
+    """
+    Return the process-wide breaker for an endpoint, or None when breakers are disabled
+    """
+    if not CIRCUIT_BREAKER_CONFIG["enabled"]:
+        return None
+
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    endpoint,
+                    CIRCUIT_BREAKER_CONFIG["failure_threshold"],
+                    CIRCUIT_BREAKER_CONFIG["open_duration"],
+                )
+                _breakers[endpoint] = breaker
+    return breaker
@@ -0,0 +1,188 @@
+"""
+Persistent Response Cache
+Author: eddy
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    from .config import TRANSLATOR_CONFIG
+except ImportError:
+    from config import TRANSLATOR_CONFIG
+
+
+def make_cache_key(**parts) -> str:
+    """
+    Build a stable cache key from the request parameters
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite backed description cache with TTL expiry and LRU eviction.
+    Expired entries are kept for stale_time more seconds so they can still be served
+    when the upstream API is down.
+    """
+
+    def __init__(self, path: str, expire_time: float, max_entries: int, stale_time: float = 0):
+        self.path = path
+        self.expire_time = expire_time
+        self.stale_time = stale_time
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._listeners = []
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, "
+            "namespace TEXT, "
+            "mode TEXT, "
+            "text TEXT, "
+            "value TEXT NOT NULL, "
+            "created REAL NOT NULL, "
+            "accessed REAL NOT NULL)"
+        )
+        # Databases created before the namespace column existed are migrated in place
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "namespace" not in columns:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN namespace TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[str]:
+        """
+        Return the cached value for key, or None when missing or expired.
+        With allow_stale, entries expired less than stale_time ago are returned too.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created = row
+            if self.expire_time > 0 and now - created > self.expire_time + (self.stale_time if allow_stale else 0):
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            return value
+
+    def add_listener(self, listener) -> None:
+        """
+        Keep a derived index in step with the cache: listener.discard(namespace, text) is
+        called for every evicted row and listener.clear() when the cache is cleared
+        """
+        self._listeners.append(listener)
+
+    def put(self, key: str, value: str, mode: str = "", text: str = "", namespace: str = "") -> None:
+        """
+        Store a value and evict expired or least recently used entries.
+        namespace groups entries sharing every request parameter except the text.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, namespace, mode, text, value, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, mode, text, value, now, now)
+            )
+            evicted = self._evict(now)
+
+        for listener in self._listeners:
+            for evicted_namespace, evicted_text in evicted:
+                if evicted_namespace and evicted_text:
+                    listener.discard(evicted_namespace, evicted_text)
+
+    def _evict(self, now: float) -> List[Tuple[str, str]]:
+        """
+        Delete expired and least recently used rows; returns their (namespace, text)
+        """
+        evicted = []
+        if self.expire_time > 0:
+            cutoff = now - self.expire_time - self.stale_time
+            evicted += self._conn.execute("SELECT namespace, text FROM responses WHERE created < ?", (cutoff,)).fetchall()
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+
+        if self.max_entries > 0:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                rows = self._conn.execute(
+                    "SELECT key, namespace, text FROM responses ORDER BY accessed ASC LIMIT ?",
+                    (count - self.max_entries,)
+                ).fetchall()
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", [(row[0],) for row in rows])
+                evicted += [(namespace, text) for _, namespace, text in rows]
+        return evicted
+
+    def entries(self) -> Iterator[Tuple[str, str, str, float]]:
+        """
+        Yield (namespace, text, value, created) for every unexpired entry
+        """
+        cutoff = time.time() - self.expire_time if self.expire_time > 0 else 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT namespace, text, value, created FROM responses WHERE created >= ? ORDER BY accessed ASC",
+                (cutoff,)
+            ).fetchall()
+        yield from rows
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            return count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+        for listener in self._listeners:
+            listener.clear()
+
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Return the process-wide response cache, or None when caching is disabled
+    """
+    global _cache_instance
+
+    if not TRANSLATOR_CONFIG["enable_cache"]:
+        return None
+
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                path = TRANSLATOR_CONFIG["cache_path"] or os.path.join(
+                    os.path.dirname(os.path.abspath(__file__)), "cache", "responses.sqlite3"
+                )
+                try:
+                    _cache_instance = ResponseCache(
+                        path,
+                        TRANSLATOR_CONFIG["cache_expire_time"],
+                        TRANSLATOR_CONFIG["cache_max_entries"],
+                        TRANSLATOR_CONFIG["cache_stale_time"],
+                    )
+                except sqlite3.Error as e:
+                    logging.error(f"Response cache unavailable at {path}: {e}")
+                    return None
+
+    return _cache_instance
@@ -0,0 +1,85 @@
+"""
+Long Text Chunking Helpers
+Author: eddy
+"""
+
+import json
+import re
+from typing import List
+
+# Output of long inputs: one merged description, or one description per chunk in order
+LONG_TEXT_MERGED = "merged"
+LONG_TEXT_TIMELINE = "timeline"
+LONG_TEXT_OUTPUTS = [LONG_TEXT_MERGED, LONG_TEXT_TIMELINE]
+
+REDUCE_INSTRUCTIONS = """The audio descriptions below cover consecutive parts of one long video script, in order.
+Merge them into ONE audio description of the whole video, following the system instructions. Keep the dominant sounds and mood and drop repetition.
+
+Parts:
+{parts}"""
+
+# A new scene starts after a blank line or at a screenplay / Chinese scene heading
+_SCENE_BREAK = re.compile(
+    r"\n[ \t]*\n(?=\s*\S)|\n(?=[ \t]*(?:INT\.|EXT\.|INT/EXT|I/E\.|第[0-9零一二三四五六七八九十百]+[场幕集]|场景\s*[0-9一二三四五六七八九十]))",
+    re.IGNORECASE
+)
+
+# One sentence: text up to a sentence terminator (a period only when followed by whitespace) and trailing space
+_SENTENCE = re.compile(r"(?:[^。！？!?；;…\n.]|\.(?!\s|$))*(?:[。！？!?；;…]+[”」』\"')）]*|\.+|\n+)?\s*")
+
+
+def split_scenes(text: str) -> List[str]:
+    """
+    Split text at scene boundaries; the pieces concatenate back to the original text
+    """
+    scenes, start = [], 0
+    for match in _SCENE_BREAK.finditer(text):
+        if match.end() > start:
+            scenes.append(text[start:match.end()])
+            start = match.end()
+    scenes.append(text[start:])
+    return [scene for scene in scenes if scene]
+
+
+def split_sentences(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into sentences; sentences longer than max_chars are cut into max_chars slices
+    """
+    pieces = []
+    for match in _SENTENCE.finditer(text):
+        sentence = match.group(0)
+        if not sentence:
+            continue
+        pieces.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+    return pieces
+
+
+def split_chunks(text: str, chunk_size: int) -> List[str]:
+    """
+    Split long text into chunks of at most chunk_size characters, preferring scene
+    boundaries and then sentence boundaries
+    """
+    if len(text) <= chunk_size:
+        return [text]
+
+    chunks: List[str] = []
+    current = ""
+    for scene in split_scenes(text):
+        pieces = [scene] if len(scene) <= chunk_size else split_sentences(scene, chunk_size)
+        for piece in pieces:
+            if current and len(current) + len(piece) > chunk_size:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current:
+        chunks.append(current)
+
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def build_reduce_prompt(descriptions: List[str]) -> str:
+    """
+    Build the user message merging per-chunk descriptions into one
+    """
+    parts = json.dumps([{"part": i + 1, "description": text} for i, text in enumerate(descriptions)], ensure_ascii=False)
+    return REDUCE_INSTRUCTIONS.format(parts=parts)
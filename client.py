@@ -0,0 +1,335 @@
+"""
+Shared OpenRouter HTTP Client
+Author: eddy
+"""
+
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+try:
+    from .config import OPENROUTER_CONFIG, USER_AGENT, PROXY_CONFIG, RATE_LIMIT_CONFIG, TRANSLATOR_CONFIG
+    from .ratelimit import AdaptiveRateLimiter, parse_retry_after
+    from .retry import RetryPolicy, LatencyTracker
+    from .breaker import record_attempt, allow_retry
+except ImportError:
+    from config import OPENROUTER_CONFIG, USER_AGENT, PROXY_CONFIG, RATE_LIMIT_CONFIG, TRANSLATOR_CONFIG
+    from ratelimit import AdaptiveRateLimiter, parse_retry_after
+    from retry import RetryPolicy, LatencyTracker
+    from breaker import record_attempt, allow_retry
+
+# Network failures that are safe to retry
+RETRYABLE_EXCEPTIONS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
+# Phase timings of the request running on the current thread, filled by the timed connections
+_connection_timings = threading.local()
+
+
+def estimate_request_tokens(payload: dict) -> int:
+    """
+    Rough upper bound of the tokens a chat request consumes (prompt plus completion budget)
+    """
+    prompt_bytes = 0
+    for message in payload.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        prompt_bytes += len(str(content).encode("utf-8"))
+    return prompt_bytes // 3 + int(payload.get("max_tokens") or 0)
+
+
+class _TimedConnectionMixin:
+    """Records DNS resolution and connect (TCP plus TLS) time of new connections"""
+
+    def _new_conn(self):
+        timings = getattr(_connection_timings, "current", None)
+        if timings is None:
+            return super()._new_conn()
+
+        dns_host = self._dns_host
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(dns_host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror:
+            # Let urllib3 resolve again and raise its own error type
+            return super()._new_conn()
+        timings["dns"] = time.perf_counter() - started
+
+        # Connect to the resolved addresses in order so the lookup is not repeated
+        last_error = None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    last_error = e
+        finally:
+            self._dns_host = dns_host
+        raise last_error
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        timings = getattr(_connection_timings, "current", None)
+        if timings is not None:
+            timings["connect"] = time.perf_counter() - started - timings.get("dns", 0.0)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+_TIMED_POOL_CLASSES = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report DNS and connect timings"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _TIMED_POOL_CLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        # SOCKS proxies bring their own connection classes
+        if not proxy.lower().startswith("socks"):
+            manager.pool_classes_by_scheme = _TIMED_POOL_CLASSES
+        return manager
+
+
+class OpenRouterClient:
+    """Process-wide pooled HTTP client used by every node"""
+
+    def __init__(self, base_url: str, pool_size: int, connect_timeout: float, read_timeout: float,
+                 proxies: Optional[Dict[str, Optional[str]]] = None, user_agent: str = "",
+                 limiter: Optional[AdaptiveRateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 hedge_percentile: float = 0, hedge_min_samples: int = 20):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.limiter = limiter
+        self.retry_policy = retry_policy or RetryPolicy(0, 0, 0)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+        self._hedge_executor = None
+        if hedge_percentile > 0:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=pool_size * 2, thread_name_prefix="mmaudio-hedge")
+
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.session.headers.update({
+            "Connection": "keep-alive",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://comfyui.local",
+            "X-Title": "ComfyUI MMAudio Description Generator",
+        })
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+
+        # Only apply proxies that are actually configured
+        configured_proxies = {scheme: url for scheme, url in (proxies or {}).items() if url}
+        if configured_proxies:
+            self.session.proxies.update(configured_proxies)
+
+    def post_chat(self, payload: dict, api_key: str, stream: bool = False, base_url: Optional[str] = None,
+                  retry: bool = True, breaker=None) -> requests.Response:
+        """
+        Send a chat completion request, retrying timeouts, connection errors, 429 and 5xx
+        with exponential backoff, and return the final raw response.
+        With stream=True the body is left unread for SSE consumption.
+        base_url overrides the client's endpoint; retry=False sends a single attempt.
+        A circuit breaker, when given, counts every attempt and stops the retries once it opens.
+        The response carries the phase timings of the final attempt in response.timings
+        and the number of retries in response.retries; a network error raised after the
+        last attempt carries the same two attributes.
+        """
+        retry_count = self.retry_policy.retry_count if retry else 0
+        attempt = 0
+        backoff = 0.0
+        while True:
+            try:
+                response = self._send_hedged(payload, api_key, stream, base_url)
+            except RETRYABLE_EXCEPTIONS as e:
+                record_attempt(breaker, None)
+                if attempt >= retry_count or not allow_retry(breaker):
+                    e.retries = attempt
+                    e.timings = dict(getattr(e, "timings", None) or {}, backoff=backoff)
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logging.warning(f"OpenRouter request failed ({e}), retry {attempt + 1} in {delay:.2f}s")
+            else:
+                record_attempt(breaker, response.status_code)
+                if (not self.retry_policy.is_retryable_status(response.status_code) or attempt >= retry_count
+                        or not allow_retry(breaker)):
+                    response.retries = attempt
+                    response.timings["backoff"] = backoff
+                    return response
+                delay = self.retry_policy.delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+                logging.warning(f"OpenRouter returned {response.status_code}, retry {attempt + 1} in {delay:.2f}s")
+                response.close()
+
+            time.sleep(delay)
+            backoff += delay
+            attempt += 1
+
+    def _send_hedged(self, payload: dict, api_key: str, stream: bool = False,
+                     base_url: Optional[str] = None) -> requests.Response:
+        """
+        Send one request; if it has not answered by the tracked latency percentile,
+        send a second identical request and return whichever succeeds first
+        """
+        hedge_delay = None
+        if self._hedge_executor is not None and len(self.latency) >= self.hedge_min_samples:
+            hedge_delay = self.latency.percentile(self.hedge_percentile)
+        if hedge_delay is None:
+            return self._send_limited(payload, api_key, stream, base_url)
+
+        primary = self._hedge_executor.submit(self._send_limited, payload, api_key, stream, base_url)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        hedge = self._hedge_executor.submit(self._send_limited, payload, api_key, stream, base_url)
+        pending = {primary, hedge}
+        fallback = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    fallback = fallback or future
+                    continue
+                response = future.result()
+                if response.status_code < 400:
+                    # Release the connection held by the slower request once it finishes
+                    for loser in pending:
+                        loser.add_done_callback(_close_future_response)
+                    if fallback is not None and fallback.exception() is None:
+                        fallback.result().close()
+                    return response
+                if fallback is None or fallback.exception() is not None:
+                    fallback = future
+                else:
+                    response.close()
+
+        # Both requests failed: prefer an HTTP response so the caller can inspect its status
+        return fallback.result()
+
+    def _send_limited(self, payload: dict, api_key: str, stream: bool = False,
+                      base_url: Optional[str] = None) -> requests.Response:
+        """
+        Send one request through the rate limiter, recording latency of successful calls.
+        Phase timings (queue, dns, connect, ttfb) are attached as response.timings;
+        dns and connect are only present when a new connection was opened.
+        """
+        timings = {"queue": 0.0}
+        if self.limiter is not None:
+            queued = time.perf_counter()
+            self.limiter.acquire(estimate_request_tokens(payload))
+            timings["queue"] = time.perf_counter() - queued
+
+        success, rate_limited, retry_after = False, False, None
+        _connection_timings.current = timings
+        try:
+            started = time.perf_counter()
+            response = self._send(payload, api_key, stream, base_url)
+            success = response.status_code < 400
+            if success:
+                self.latency.record(time.perf_counter() - started)
+            if response.status_code == 429:
+                rate_limited = True
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            # Time from sending the request until the response headers were parsed
+            timings["ttfb"] = response.elapsed.total_seconds()
+            response.timings = timings
+            return response
+        except Exception as e:
+            # Queue and connection phases explain failed attempts too
+            e.timings = timings
+            raise
+        finally:
+            _connection_timings.current = None
+            if self.limiter is not None:
+                self.limiter.release(success, rate_limited, retry_after)
+
+    def _send(self, payload: dict, api_key: str, stream: bool = False,
+              base_url: Optional[str] = None) -> requests.Response:
+        return self.session.post(
+            f"{(base_url or self.base_url).rstrip('/')}/chat/completions",
+            headers={"Authorization": f"Bearer {api_key.strip()}"},
+            json=payload,
+            timeout=self.timeout,
+            stream=stream
+        )
+
+    def close(self) -> None:
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self.session.close()
+
+
+def _close_future_response(future) -> None:
+    if future.exception() is None:
+        future.result().close()
+
+
+_client_instance = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OpenRouterClient:
+    """
+    Return the process-wide OpenRouter client, creating it on first use
+    """
+    global _client_instance
+
+    if _client_instance is None:
+        with _client_lock:
+            if _client_instance is None:
+                _client_instance = OpenRouterClient(
+                    OPENROUTER_CONFIG["base_url"],
+                    OPENROUTER_CONFIG["pool_size"],
+                    OPENROUTER_CONFIG["connect_timeout"],
+                    OPENROUTER_CONFIG["timeout"],
+                    proxies=PROXY_CONFIG,
+                    user_agent=USER_AGENT,
+                    limiter=AdaptiveRateLimiter(
+                        RATE_LIMIT_CONFIG["requests_per_second"],
+                        RATE_LIMIT_CONFIG["tokens_per_minute"],
+                        RATE_LIMIT_CONFIG["max_concurrency"],
+                        RATE_LIMIT_CONFIG["min_concurrency"],
+                    ),
+                    retry_policy=RetryPolicy(
+                        TRANSLATOR_CONFIG["retry_count"],
+                        TRANSLATOR_CONFIG["retry_backoff_base"],
+                        TRANSLATOR_CONFIG["retry_backoff_max"],
+                    ),
+                    hedge_percentile=TRANSLATOR_CONFIG["hedge_percentile"],
+                    hedge_min_samples=TRANSLATOR_CONFIG["hedge_min_samples"],
+                )
+
+    return _client_instance
@@ -0,0 +1,113 @@
+"""
+Embedding Fingerprint Registry
+Author: eddy
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    from .config import EMBEDDING_REGISTRY_CONFIG
+except ImportError:
+    from config import EMBEDDING_REGISTRY_CONFIG
+
+# Keys of WanVideo text embedding dicts that hold prompt tensors
+EMBEDDING_KEYS = ("prompt_embeds", "positive_prompt_embeds")
+
+
+def _strided_sample(tensor, samples: int) -> Optional[bytes]:
+    """
+    Bytes of at most `samples` evenly strided elements, read through a flat view of the
+    tensor's buffer so only the sampled elements are copied (to the CPU, as float32)
+    """
+    if hasattr(tensor, "detach"):
+        # torch.Tensor, on any device
+        flat = tensor.detach().reshape(-1)
+        step = max(1, flat.shape[0] // samples)
+        return flat[::step][:samples].float().cpu().numpy().tobytes()
+    if hasattr(tensor, "reshape") and hasattr(tensor, "tobytes"):
+        # numpy.ndarray
+        flat = tensor.reshape(-1)
+        step = max(1, flat.shape[0] // samples)
+        return flat[::step][:samples].tobytes()
+    return None
+
+
+def tensor_fingerprint(value, samples: Optional[int] = None) -> Optional[str]:
+    """
+    Cheap fingerprint of a tensor or a list of tensors from shape, dtype and a strided
+    sample of the values; None when value holds no tensor
+    """
+    samples = samples or EMBEDDING_REGISTRY_CONFIG["samples"]
+    tensors = value if isinstance(value, (list, tuple)) else [value]
+
+    digest = hashlib.blake2b(digest_size=16)
+    found = False
+    for tensor in tensors:
+        sample = _strided_sample(tensor, samples)
+        if sample is None:
+            continue
+        digest.update(f"{tuple(tensor.shape)}:{tensor.dtype}:".encode("utf-8"))
+        digest.update(sample)
+        found = True
+    return digest.hexdigest() if found else None
+
+
+def embeds_fingerprint(text_embeds) -> Optional[str]:
+    """
+    Fingerprint of the first prompt tensor entry of a WanVideo text embeds dict
+    """
+    if not isinstance(text_embeds, dict):
+        return None
+    for key in EMBEDDING_KEYS:
+        if text_embeds.get(key) is not None:
+            return tensor_fingerprint(text_embeds[key])
+    return None
+
+
+class EmbeddingRegistry:
+    """Bounded LRU map from embedding fingerprint to the prompt that produced it"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._prompts: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, fingerprint: str, prompt: str) -> None:
+        with self._lock:
+            self._prompts[fingerprint] = prompt
+            self._prompts.move_to_end(fingerprint)
+            while len(self._prompts) > self.max_entries:
+                self._prompts.popitem(last=False)
+
+    def lookup(self, fingerprint: Optional[str]) -> Optional[str]:
+        if fingerprint is None:
+            return None
+        with self._lock:
+            prompt = self._prompts.get(fingerprint)
+            if prompt is not None:
+                self._prompts.move_to_end(fingerprint)
+            return prompt
+
+    def __len__(self) -> int:
+        return len(self._prompts)
+
+
+_registry_instance = None
+_registry_lock = threading.Lock()
+
+
+def get_embedding_registry() -> EmbeddingRegistry:
+    """
+    Return the process-wide embedding registry, creating it on first use
+    """
+    global _registry_instance
+
+    if _registry_instance is None:
+        with _registry_lock:
+            if _registry_instance is None:
+                _registry_instance = EmbeddingRegistry(EMBEDDING_REGISTRY_CONFIG["max_entries"])
+
+    return _registry_instance
@@ -0,0 +1,197 @@
+"""
+Persistent Background Description Jobs
+Author: eddy
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .config import BACKGROUND_CONFIG
+except ImportError:
+    from config import BACKGROUND_CONFIG
+
+# runner(payload, api_key) -> True once a fresh result is stored
+JobRunner = Callable[[dict, str], bool]
+
+
+class BackgroundJobQueue:
+    """
+    Worker pool for description jobs, backed by a SQLite queue file so pending jobs
+    survive restarts. Jobs are keyed by their cache key, so repeated submissions of the
+    same request share one job. API keys are only held in memory: jobs restored from
+    the queue file run with the key of the next submitted job.
+    """
+
+    def __init__(self, path: str, runner: JobRunner, workers: int = 2, max_attempts: int = 3,
+                 retry_delay: float = 30.0):
+        self.path = path
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._payloads: Dict[str, dict] = {}
+        self._api_keys: Dict[str, str] = {}
+        self._owners: Dict[str, set] = {}
+        self._versions: Dict[str, int] = {}
+        self._waiting_for_key: List[str] = []
+        self._default_api_key = ""
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "key TEXT PRIMARY KEY, "
+            "payload TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "created REAL NOT NULL)"
+        )
+        for key, payload in self._conn.execute("SELECT key, payload FROM jobs ORDER BY created ASC").fetchall():
+            self._payloads[key] = json.loads(payload)
+            self._waiting_for_key.append(key)
+        if self._waiting_for_key:
+            logging.info(f"Restored {len(self._waiting_for_key)} background description jobs from {path}")
+
+    def submit(self, key: str, payload: dict, api_key: str, owner: Optional[str] = None) -> bool:
+        """
+        Queue a job unless one with the same key is pending; returns True when newly queued
+        """
+        with self._lock:
+            self._start_workers()
+            if owner is not None:
+                self._owners.setdefault(key, set()).add(owner)
+            self._default_api_key = api_key
+            if self._waiting_for_key:
+                for waiting in self._waiting_for_key:
+                    self._queue.put(waiting)
+                self._waiting_for_key = []
+
+            if key in self._payloads:
+                self._api_keys.setdefault(key, api_key)
+                return False
+            self._payloads[key] = payload
+            self._api_keys[key] = api_key
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (key, payload, attempts, created) VALUES (?, ?, 0, ?)",
+                (key, json.dumps(payload, ensure_ascii=False), time.time())
+            )
+        self._queue.put(key)
+        return True
+
+    def version(self, owner: Optional[str]) -> int:
+        """
+        Number of jobs submitted by owner that have finished; changes when a fresh result is ready
+        """
+        with self._lock:
+            return self._versions.get(owner, 0)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._payloads)
+
+    def _start_workers(self) -> None:
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"mmaudio-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            key = self._queue.get()
+            with self._lock:
+                payload = self._payloads.get(key)
+                api_key = self._api_keys.get(key) or self._default_api_key
+            if payload is None:
+                continue
+
+            try:
+                success = self.runner(payload, api_key)
+            except Exception as e:
+                logging.error(f"Background description job failed: {e}")
+                success = False
+
+            if success:
+                self._finish(key)
+            else:
+                self._retry(key)
+
+    def _finish(self, key: str) -> None:
+        with self._lock:
+            self._payloads.pop(key, None)
+            self._api_keys.pop(key, None)
+            for owner in self._owners.pop(key, ()):
+                self._versions[owner] = self._versions.get(owner, 0) + 1
+            self._conn.execute("DELETE FROM jobs WHERE key = ?", (key,))
+
+    def _retry(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET attempts = attempts + 1 WHERE key = ?", (key,))
+            row = self._conn.execute("SELECT attempts FROM jobs WHERE key = ?", (key,)).fetchone()
+            attempts = row[0] if row else self.max_attempts
+        if attempts >= self.max_attempts:
+            logging.warning(f"Dropping background description job after {attempts} attempts")
+            with self._lock:
+                self._payloads.pop(key, None)
+                self._api_keys.pop(key, None)
+                self._owners.pop(key, None)
+                self._conn.execute("DELETE FROM jobs WHERE key = ?", (key,))
+            return
+        timer = threading.Timer(self.retry_delay, self._queue.put, (key,))
+        timer.daemon = True
+        timer.start()
+
+
+_queue_instance = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue(runner: JobRunner) -> Optional[BackgroundJobQueue]:
+    """
+    Return the process-wide background job queue, creating it with runner on first use;
+    None when the queue file cannot be opened
+    """
+    global _queue_instance
+
+    if _queue_instance is None:
+        with _queue_lock:
+            if _queue_instance is None:
+                path = BACKGROUND_CONFIG["queue_path"] or os.path.join(
+                    os.path.dirname(os.path.abspath(__file__)), "cache", "jobs.sqlite3"
+                )
+                try:
+                    _queue_instance = BackgroundJobQueue(
+                        path,
+                        runner,
+                        BACKGROUND_CONFIG["workers"],
+                        BACKGROUND_CONFIG["max_attempts"],
+                        BACKGROUND_CONFIG["retry_delay"],
+                    )
+                except sqlite3.Error as e:
+                    logging.error(f"Background job queue unavailable at {path}: {e}")
+                    return None
+
+    return _queue_instance
+
+
+def job_version(owner: Optional[str]) -> int:
+    """
+    BackgroundJobQueue.version of the process-wide queue, without creating the queue;
+    0 while no job has been submitted yet
+    """
+    queue = _queue_instance
+    return queue.version(owner) if queue is not None else 0
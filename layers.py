@@ -0,0 +1,51 @@
+"""
+Layered Audio Element Composition
+Author: eddy
+"""
+
+import json
+from typing import List, Tuple
+
+# Element inputs of the layer combiner and the mode each one is described in
+LAYER_ELEMENTS = (
+    ("music", "background_music"),
+    ("ambience", "ambient_sound"),
+    ("voice", "voice_narration"),
+    ("effects", "special_effects"),
+)
+
+# Final description: element descriptions joined locally, or merged by one short API call
+MERGE_TEMPLATE = "template"
+MERGE_API = "api"
+MERGE_MODES = [MERGE_TEMPLATE, MERGE_API]
+
+LAYER_MERGE_INSTRUCTIONS = """The audio descriptions below are separate layers that play at the same time in one video shot.
+Merge them into ONE audio description of the whole mix, following the system instructions. Keep every layer recognisable, foreground sounds first.
+
+Layers:
+{layers}"""
+
+
+def layer_items(elements: dict, extra_elements: str, extra_mode: str) -> List[Tuple[str, str, str]]:
+    """
+    (layer name, text, mode) for every non-blank element; extra_elements holds one
+    element per line, described in extra_mode
+    """
+    items = [(name, elements.get(name, "").strip(), mode) for name, mode in LAYER_ELEMENTS]
+    items += [("extra", line.strip(), extra_mode) for line in extra_elements.splitlines()]
+    return [item for item in items if item[1]]
+
+
+def compose_template(descriptions: List[str], delimiter: str) -> str:
+    """
+    Local merge: element descriptions joined in layer order
+    """
+    return delimiter.join(description.strip().rstrip(".") for description in descriptions if description.strip())
+
+
+def build_layer_merge_prompt(layers: List[Tuple[str, str]]) -> str:
+    """
+    Build the user message merging (layer name, description) pairs into one description
+    """
+    parts = json.dumps([{"layer": name, "description": text} for name, text in layers], ensure_ascii=False)
+    return LAYER_MERGE_INSTRUCTIONS.format(layers=parts)
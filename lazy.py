@@ -0,0 +1,46 @@
+"""
+Deferred Module Imports
+Author: eddy
+"""
+
+import importlib
+import threading
+from typing import Optional
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access, so importing
+    the node package does not pay for the network stack or the stores up front
+    """
+
+    def __init__(self, name: str, package: Optional[str] = None):
+        self._name = name
+        self._package = package or None
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    if self._package:
+                        self._module = importlib.import_module(f".{self._name}", self._package)
+                    else:
+                        self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name: str, package: Optional[str] = None) -> LazyModule:
+    """
+    Deferred import of a module; pass the caller's __package__ to import a sibling
+    module of this package (plain absolute import when loaded outside a package)
+    """
+    return LazyModule(name, package)
@@ -0,0 +1,289 @@
+"""
+Offline Lexicon Description Engine
+Author: eddy
+"""
+
+import re
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# Engine choices exposed by the nodes
+ENGINE_API = "API only"
+ENGINE_LOCAL_FIRST = "local first, API fallback"
+ENGINE_LOCAL = "local only"
+ENGINES = [ENGINE_API, ENGINE_LOCAL_FIRST, ENGINE_LOCAL]
+
+# Lexicon entry kinds
+SUBJECT = "subject"
+DETAIL = "detail"
+MOOD = "mood"
+GENERIC = "generic"  # Only used when nothing more specific matched
+
+# (keywords, category, kind, phrase); category is an AUDIO_MODES value or "" for any mode
+LEXICON_ENTRIES = [
+    # Background music
+    (["钢琴", "piano"], "background_music", SUBJECT, "piano melody"),
+    (["吉他", "木吉他", "guitar", "acoustic guitar"], "background_music", SUBJECT, "acoustic guitar"),
+    (["小提琴", "violin"], "background_music", SUBJECT, "violin melody"),
+    (["大提琴", "cello"], "background_music", SUBJECT, "deep cello melody"),
+    (["古筝", "guzheng"], "background_music", SUBJECT, "traditional guzheng melody"),
+    (["二胡", "erhu"], "background_music", SUBJECT, "expressive erhu melody"),
+    (["笛子", "竹笛", "flute"], "background_music", SUBJECT, "airy flute melody"),
+    (["爵士", "jazz"], "background_music", SUBJECT, "jazz piano"),
+    (["电子", "电音", "edm", "electronic"], "background_music", SUBJECT, "electronic dance music"),
+    (["交响", "管弦", "orchestra", "orchestral", "symphony"], "background_music", SUBJECT, "orchestral soundtrack"),
+    (["摇滚", "rock"], "background_music", SUBJECT, "rock music with driving electric guitars"),
+    (["嘻哈", "说唱", "hip hop", "rap"], "background_music", SUBJECT, "hip hop beat"),
+    (["古典", "classical"], "background_music", SUBJECT, "classical music"),
+    (["鼓", "drums", "percussion"], "background_music", DETAIL, "light percussion"),
+    (["贝斯", "低音", "bass"], "background_music", DETAIL, "pulsing bass"),
+    (["音乐", "配乐", "背景音乐", "music", "bgm", "soundtrack"], "background_music", GENERIC, "background music"),
+
+    # Ambient sound
+    (["下雨", "雨", "rain", "raining"], "ambient_sound", SUBJECT, "gentle rain"),
+    (["雷", "打雷", "thunder"], "ambient_sound", DETAIL, "distant thunder"),
+    (["风", "wind"], "ambient_sound", DETAIL, "soft wind"),
+    (["森林", "树林", "forest", "woods"], "ambient_sound", SUBJECT, "forest ambience"),
+    (["鸟", "鸟叫", "birds", "birdsong"], "ambient_sound", DETAIL, "birds chirping"),
+    (["海浪", "海边", "大海", "ocean", "waves", "beach"], "ambient_sound", SUBJECT, "ocean waves"),
+    (["海鸥", "seagulls"], "ambient_sound", DETAIL, "seagulls in the distance"),
+    (["咖啡厅", "咖啡馆", "咖啡", "cafe", "coffee shop"], "ambient_sound", SUBJECT, "coffee shop ambience"),
+    (["壁炉", "篝火", "fireplace", "campfire"], "ambient_sound", SUBJECT, "crackling fireplace"),
+    (["城市", "街道", "city", "street"], "ambient_sound", SUBJECT, "busy city street ambience"),
+    (["车流", "交通", "traffic"], "ambient_sound", DETAIL, "urban traffic noise"),
+    (["溪流", "小溪", "河流", "stream", "river"], "ambient_sound", SUBJECT, "flowing stream"),
+    (["夜晚", "夜", "night"], "ambient_sound", DETAIL, "quiet night crickets"),
+    (["人群", "crowd"], "ambient_sound", DETAIL, "murmuring crowd"),
+    (["聊天", "交谈", "chatter"], "ambient_sound", DETAIL, "soft chatter"),
+    (["环境", "氛围", "ambience", "ambient"], "ambient_sound", GENERIC, "calm ambience"),
+
+    # Voice narration
+    (["女性说话", "女声", "女人说话", "女性", "female voice", "woman"], "voice_narration", SUBJECT, "warm female voice"),
+    (["男性说话", "男声", "男人说话", "男性", "male voice", "man"], "voice_narration", SUBJECT, "deep male voice"),
+    (["旁白", "解说", "narrator", "narration"], "voice_narration", SUBJECT, "calm narrator"),
+    (["耳语", "低语", "whisper", "whispering"], "voice_narration", SUBJECT, "whispered voice"),
+    (["对话", "conversation", "dialogue"], "voice_narration", SUBJECT, "conversation between multiple voices"),
+    (["说话", "讲话", "speaking", "talking"], "voice_narration", DETAIL, "speaking softly"),
+    (["唱歌", "歌声", "singing"], "voice_narration", SUBJECT, "soft singing voice"),
+    (["笑声", "笑", "laughter", "laughing"], "voice_narration", DETAIL, "light laughter"),
+
+    # Special effects
+    (["脚步", "脚步声", "footsteps"], "special_effects", SUBJECT, "footsteps"),
+    (["高跟鞋", "high heels", "heels"], "special_effects", SUBJECT, "high heels clicking"),
+    (["木地板", "地板", "wooden floor", "floor"], "special_effects", DETAIL, "on wooden floor"),
+    (["键盘", "打字", "keyboard", "typing"], "special_effects", SUBJECT, "rhythmic keyboard typing"),
+    (["汽车", "引擎", "car", "engine"], "special_effects", SUBJECT, "car engine rumbling"),
+    (["时钟", "钟表", "滴答", "clock", "ticking"], "special_effects", SUBJECT, "steady clock ticking"),
+    (["敲门", "knock", "knocking"], "special_effects", SUBJECT, "knocking on a door"),
+    (["开门", "关门", "门", "door"], "special_effects", SUBJECT, "door creaking"),
+    (["玻璃", "glass"], "special_effects", SUBJECT, "glass clinking"),
+    (["爆炸", "explosion"], "special_effects", SUBJECT, "powerful explosion"),
+    (["枪声", "gunshot", "gunshots"], "special_effects", SUBJECT, "sharp gunshots"),
+    (["水滴", "滴水", "dripping"], "special_effects", SUBJECT, "water dripping"),
+    (["回声", "回响", "echo", "echoing"], "special_effects", DETAIL, "echoing"),
+
+    # Adult content
+    (["呼吸", "喘息", "breathing"], "adult_content", SUBJECT, "intimate breathing"),
+    (["呻吟", "moans", "moaning"], "adult_content", DETAIL, "soft passionate moans"),
+    (["卧室", "bedroom"], "adult_content", SUBJECT, "romantic bedroom ambience"),
+    (["叹息", "sighs"], "adult_content", DETAIL, "gentle sighs"),
+
+    # Moods apply to every mode
+    (["欢快", "愉快", "开心", "cheerful", "happy", "upbeat"], "", MOOD, "cheerful"),
+    (["轻柔", "柔和", "温柔", "soft", "gentle"], "", MOOD, "soft"),
+    (["安静", "宁静", "平静", "calm", "peaceful", "quiet"], "", MOOD, "peaceful"),
+    (["放松", "舒缓", "relaxing", "relaxed"], "", MOOD, "relaxing"),
+    (["悲伤", "伤感", "忧郁", "sad", "melancholic"], "", MOOD, "melancholic"),
+    (["紧张", "悬疑", "tense", "suspense", "suspenseful"], "", MOOD, "tense"),
+    (["激昂", "激动", "热烈", "energetic", "epic"], "", MOOD, "energetic"),
+    (["浪漫", "romantic"], "", MOOD, "romantic"),
+    (["神秘", "mysterious", "mystery"], "", MOOD, "mysterious"),
+    (["温暖", "warm", "cozy"], "", MOOD, "warm"),
+]
+
+# Filler words that carry no audio meaning and do not count against coverage
+FILLER_WORDS = [
+    "的", "声", "音", "声音", "音效", "音乐声", "一段", "一些", "有", "和", "与", "在", "着", "了",
+    "sound", "sounds", "of", "the", "a", "an", "and", "with", "some",
+]
+
+# Details starting with these words attach directly instead of after "with"
+_ATTACHED_PREFIXES = ("on ", "in ", "through ", "at ")
+
+# Phrases appended when a description is too short, per mode
+MODE_TAILS = {
+    "background_music": "with gentle rhythm and soft dynamics",
+    "ambient_sound": "creating a calm immersive atmosphere",
+    "voice_narration": "speaking with clear friendly tone",
+    "special_effects": "with crisp natural acoustics",
+    "adult_content": "with intimate breathy quality",
+    "audio_description": "creating a natural immersive atmosphere",
+}
+
+_ASCII_WORD = re.compile(r"[a-z0-9]")
+_SKIP_CHARS = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+class AhoCorasick:
+    """Multi-pattern matcher that finds every keyword in one pass over the text"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, object]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, value: object) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), value))
+        self._built = False
+
+    def build(self) -> None:
+        queue = deque()
+        for next_state in self._goto[0].values():
+            self._fail[next_state] = 0
+            queue.append(next_state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+
+    def find_all(self, text: str) -> List[Tuple[int, int, object]]:
+        """
+        Return every (start, end, value) match in text
+        """
+        if not self._built:
+            self.build()
+
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._output[state]:
+                matches.append((index - length + 1, index + 1, value))
+        return matches
+
+
+def _select_matches(text: str, matches: List[Tuple[int, int, object]]) -> List[Tuple[int, int, object]]:
+    """
+    Keep leftmost-longest, non-overlapping matches; ASCII keywords must sit on word boundaries
+    """
+    def on_boundary(start: int, end: int) -> bool:
+        if _ASCII_WORD.match(text[start]) and start > 0 and _ASCII_WORD.match(text[start - 1]):
+            return False
+        if _ASCII_WORD.match(text[end - 1]) and end < len(text) and _ASCII_WORD.match(text[end]):
+            return False
+        return True
+
+    selected = []
+    last_end = 0
+    for start, end, value in sorted(matches, key=lambda match: (match[0], -(match[1] - match[0]))):
+        if start >= last_end and on_boundary(start, end):
+            selected.append((start, end, value))
+            last_end = end
+    return selected
+
+
+class LexiconEngine:
+    """Compose short audio descriptions locally from a bilingual keyword lexicon"""
+
+    def __init__(self, entries=None, min_coverage: float = 0.6):
+        self.min_coverage = min_coverage
+        self._matcher = AhoCorasick()
+        for keywords, category, kind, phrase in entries or LEXICON_ENTRIES:
+            for keyword in keywords:
+                self._matcher.add(keyword.lower(), (category, kind, phrase))
+        for filler in FILLER_WORDS:
+            self._matcher.add(filler, None)
+        self._matcher.build()
+
+    def describe(self, text: str, mode: str = "audio_description") -> Optional[str]:
+        """
+        Return a 5-15 word description, or None when the input is not covered well enough
+        """
+        normalized = text.strip().lower()
+        if not normalized:
+            return None
+
+        matches = _select_matches(normalized, self._matcher.find_all(normalized))
+
+        # Coverage: share of meaningful characters explained by keywords or filler words
+        meaningful = len(_SKIP_CHARS.sub("", normalized))
+        covered = sum(len(_SKIP_CHARS.sub("", normalized[start:end])) for start, end, _ in matches)
+        if meaningful == 0 or covered / meaningful < self.min_coverage:
+            return None
+
+        moods, subjects, details, generics = [], [], [], []
+        categories = []
+        for _, _, value in matches:
+            if value is None:
+                continue
+            category, kind, phrase = value
+            if category and mode != "audio_description" and category != mode:
+                # Keywords from other categories cannot be honored in a focused mode
+                return None
+            if category and category not in categories:
+                categories.append(category)
+            target = {MOOD: moods, SUBJECT: subjects, DETAIL: details, GENERIC: generics}[kind]
+            if phrase not in target:
+                target.append(phrase)
+
+        if not subjects and not details:
+            subjects = generics
+        if not subjects and not details:
+            return None
+        # The general mode borrows the tail of the first matched category
+        tail_mode = categories[0] if mode == "audio_description" and categories else mode
+        return self._compose(moods, subjects, details, tail_mode)
+
+    @staticmethod
+    def _compose(moods: List[str], subjects: List[str], details: List[str], mode: str) -> str:
+        if not subjects:
+            subjects, details = details[:1], details[1:]
+
+        head = subjects[0]
+        if moods and not head.startswith(moods[0]):
+            head = f"{moods[0]} {head}"
+        attached = [phrase for phrase in details if phrase.startswith(_ATTACHED_PREFIXES)]
+        extras = subjects[1:] + [phrase for phrase in details if phrase not in attached]
+        description = " ".join([head] + attached[:1])
+        if extras:
+            description += " with " + " and ".join(extras[:3])
+
+        words = description.split()
+        if len(words) < 5:
+            description += " " + MODE_TAILS.get(mode, MODE_TAILS["audio_description"])
+            words = description.split()
+        description = " ".join(words[:15])
+        return description[0].upper() + description[1:]
+
+
+_engine_instance = None
+
+
+def get_lexicon_engine() -> LexiconEngine:
+    """
+    Return the shared lexicon engine, building the matcher on first use
+    """
+    global _engine_instance
+    if _engine_instance is None:
+        _engine_instance = LexiconEngine()
+    return _engine_instance
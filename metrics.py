@@ -0,0 +1,316 @@
+"""
+Per-call Instrumentation and Metrics Export
+Author: eddy
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    from .config import METRICS_CONFIG
+except ImportError:
+    from config import METRICS_CONFIG
+
+# Node class currently executing, so API-layer records can be attributed to it
+current_node: contextvars.ContextVar = contextvars.ContextVar("mmaudio_current_node", default="unknown")
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Request phases reported alongside the total: limiter wait, DNS, TCP plus TLS,
+# time to response headers and retry backoff
+PHASES = ("queue", "dns", "connect", "ttfb", "backoff")
+
+
+def track_node(method):
+    """
+    Decorator for node entry points: attributes every API call made inside to the node class
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        token = current_node.set(type(self).__name__)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            current_node.reset(token)
+    return wrapper
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = ",".join(f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                       for name, value in labels)
+    return "{" + escaped + "}"
+
+
+class MetricsRegistry:
+    """In-process aggregation of call metrics with Prometheus text rendering"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._gauges: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, help_text: str, value: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, help_text: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, help_text: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram()
+            histogram.observe(value)
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} gauge")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class RollingTraceWriter:
+    """Append-only JSONL trace file rotated by size, kept open between writes"""
+
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._handle = None
+        self._size = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, record: dict) -> None:
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            try:
+                if self._handle is None:
+                    self._handle = open(self.path, "ab", buffering=0)
+                    self._size = self._handle.tell()
+                if self.max_bytes > 0 and self._size and self._size + len(data) > self.max_bytes:
+                    self._handle.close()
+                    self._handle = None
+                    self._rotate()
+                    self._handle = open(self.path, "ab", buffering=0)
+                    self._size = 0
+                # Unbuffered binary writes: one syscall per record, nothing lost on a crash
+                self._handle.write(data)
+                self._size += len(data)
+            except OSError as e:
+                logging.warning(f"Metrics trace write failed: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+registry = MetricsRegistry()
+_trace_writer: Optional[RollingTraceWriter] = None
+_metrics_server = None
+_setup_lock = threading.Lock()
+_setup_done = False
+
+
+def _ensure_exporters() -> None:
+    """
+    Start the optional HTTP endpoint and trace file on first use
+    """
+    global _trace_writer, _metrics_server, _setup_done
+
+    if _setup_done:
+        return
+    with _setup_lock:
+        if _setup_done:
+            return
+        if METRICS_CONFIG["trace_path"]:
+            _trace_writer = RollingTraceWriter(
+                METRICS_CONFIG["trace_path"], METRICS_CONFIG["trace_max_bytes"], METRICS_CONFIG["trace_backups"]
+            )
+        if METRICS_CONFIG["http_port"]:
+            _metrics_server = start_metrics_server(METRICS_CONFIG["http_host"], METRICS_CONFIG["http_port"])
+        _setup_done = True
+
+
+def start_metrics_server(host: str, port: int):
+    """
+    Serve the registry in Prometheus text format at /metrics on a background thread;
+    returns the ThreadingHTTPServer, or None when the port cannot be bound
+    """
+    # Imported here so the HTTP server stack only loads when the endpoint is enabled
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logging.error(f"Metrics endpoint could not bind {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mmaudio-metrics", daemon=True).start()
+    logging.info(f"Metrics endpoint listening on http://{host}:{server.server_port}/metrics")
+    return server
+
+
+def record_call(mode: str, outcome: str, cache: str, total: float, timings: Optional[dict] = None,
+                usage: Optional[dict] = None, retries: int = 0, model: str = "", status: int = 0,
+                error: str = "") -> None:
+    """
+    Record one description request.
+    outcome is "success", "error" or "circuit_open"; cache is "hit", "similar", "stale", "local" or "miss".
+    error names the exception of a request that failed without a response.
+    """
+    if not METRICS_CONFIG["enabled"]:
+        return
+    _ensure_exporters()
+
+    node = current_node.get()
+    timings = timings or {}
+    usage = usage or {}
+
+    registry.inc("mmaudio_requests_total", "Description requests by node, mode, outcome and cache result",
+                 node=node, mode=mode, outcome=outcome, cache=cache)
+    registry.observe("mmaudio_request_seconds", "Request latency by phase in seconds",
+                     total, node=node, phase="total")
+    for phase in PHASES:
+        if timings.get(phase) is not None:
+            registry.observe("mmaudio_request_seconds", "Request latency by phase in seconds",
+                             timings[phase], node=node, phase=phase)
+    if retries:
+        registry.inc("mmaudio_retries_total", "Retried upstream attempts", retries, node=node)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            registry.inc("mmaudio_tokens_total", "Tokens reported by the API", usage[kind],
+                         node=node, kind=kind.replace("_tokens", ""))
+
+    if _trace_writer is not None:
+        _trace_writer.write({
+            "ts": time.time(),
+            "node": node,
+            "mode": mode,
+            "model": model,
+            "outcome": outcome,
+            "status": status,
+            "cache": cache,
+            "total": round(total, 6),
+            **{phase: round(timings[phase], 6) for phase in PHASES if timings.get(phase) is not None},
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+            "retries": retries,
+            **({"error": error} if error else {}),
+        })
+
+
+def record_similarity_lookup(hit: bool) -> None:
+    """
+    Record one near-duplicate index lookup
+    """
+    if not METRICS_CONFIG["enabled"]:
+        return
+    _ensure_exporters()
+
+    registry.inc("mmaudio_similarity_lookups_total", "Near-duplicate index lookups by result",
+                 result="hit" if hit else "miss")
+
+
+# Numeric encoding of circuit breaker states for the gauge
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def record_circuit_state(endpoint: str, state: str) -> None:
+    """
+    Record a circuit breaker transition
+    """
+    if not METRICS_CONFIG["enabled"]:
+        return
+    _ensure_exporters()
+
+    registry.set_gauge("mmaudio_circuit_state", "Circuit breaker state per endpoint (0 closed, 1 half-open, 2 open)",
+                       CIRCUIT_STATE_VALUES.get(state, 0), endpoint=endpoint)
+    registry.inc("mmaudio_circuit_transitions_total", "Circuit breaker transitions per endpoint and new state",
+                 endpoint=endpoint, state=state)
+    if _trace_writer is not None:
+        _trace_writer.write({"ts": time.time(), "event": "circuit", "endpoint": endpoint, "state": state})
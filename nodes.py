@@ -3,82 +3,672 @@ String Multiline Translator Nodes
 Author: eddy
 """
 
+import contextvars
 import logging
-import time
 import json
-import requests
-from typing import Tuple, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple, Optional
 
 try:
-    from .config import TRANSLATOR_CONFIG, USER_AGENT, PROXY_CONFIG, OPENROUTER_CONFIG, SYSTEM_PROMPT
+    from .config import TRANSLATOR_CONFIG, USER_AGENT, PROXY_CONFIG, OPENROUTER_CONFIG, MODE_BUDGETS, STREAMING_CONFIG, ASYNC_CONFIG
+    from .breaker import CircuitOpenError
+    from .batch import split_items, run_batch, iter_ordered
+    from .packing import make_packs, build_packed_prompt, parse_packed_response
+    from .streaming import read_streamed_description
+    from .singleflight import SingleFlight
+    from .prompts import build_messages, get_prompt_fingerprint
+    from .lexicon import ENGINES, ENGINE_API, ENGINE_LOCAL, get_lexicon_engine
+    from .metrics import record_call, track_node
+    from .lazy import lazy_module
+    from .embeddings import embeds_fingerprint, get_embedding_registry
+    from .chunking import LONG_TEXT_MERGED, LONG_TEXT_OUTPUTS, LONG_TEXT_TIMELINE, split_chunks, build_reduce_prompt
+    from .timeline import parse_segments, format_timestamp
+    from .replacer import get_replacer, rules_file_stamp
+    from .layers import LAYER_ELEMENTS, MERGE_MODES, MERGE_TEMPLATE, MERGE_API, layer_items, compose_template, build_layer_merge_prompt
 except ImportError:
-    from config import TRANSLATOR_CONFIG, USER_AGENT, PROXY_CONFIG, OPENROUTER_CONFIG, SYSTEM_PROMPT
+    from config import TRANSLATOR_CONFIG, USER_AGENT, PROXY_CONFIG, OPENROUTER_CONFIG, MODE_BUDGETS, STREAMING_CONFIG, ASYNC_CONFIG
+    from breaker import CircuitOpenError
+    from batch import split_items, run_batch, iter_ordered
+    from packing import make_packs, build_packed_prompt, parse_packed_response
+    from streaming import read_streamed_description
+    from singleflight import SingleFlight
+    from prompts import build_messages, get_prompt_fingerprint
+    from lexicon import ENGINES, ENGINE_API, ENGINE_LOCAL, get_lexicon_engine
+    from metrics import record_call, track_node
+    from lazy import lazy_module
+    from embeddings import embeds_fingerprint, get_embedding_registry
+    from chunking import LONG_TEXT_MERGED, LONG_TEXT_OUTPUTS, LONG_TEXT_TIMELINE, split_chunks, build_reduce_prompt
+    from timeline import parse_segments, format_timestamp
+    from replacer import get_replacer, rules_file_stamp
+    from layers import LAYER_ELEMENTS, MERGE_MODES, MERGE_TEMPLATE, MERGE_API, layer_items, compose_template, build_layer_merge_prompt
 
 TRANSLATOR_AVAILABLE = True
 
-def call_openrouter_api(text: str, api_key: str, mode: str = "audio_description") -> Tuple[str, str]:
+# The network stack, the stores and asyncio load on first use, not when ComfyUI imports the package
+_requests = lazy_module("requests")
+_asyncio = lazy_module("asyncio")
+_router = lazy_module("router", __package__)
+_aclient = lazy_module("aclient", __package__)
+_cache = lazy_module("cache", __package__)
+_similarity = lazy_module("similarity", __package__)
+_jobs = lazy_module("jobs", __package__)
+
+_in_flight_requests = SingleFlight()
+
+# Event loop of the async node entry point the current node body was started from
+node_event_loop: contextvars.ContextVar = contextvars.ContextVar("mmaudio_node_event_loop", default=None)
+
+def _mode_budget(mode: str) -> dict:
     """
-    Call OpenRouter API to generate audio descriptions
+    Output token and word budget for a mode, falling back to the global max_tokens
     """
-    if not api_key or not api_key.strip():
-        return "Error: API key is required", mode
+    return MODE_BUDGETS.get(mode, {"max_tokens": OPENROUTER_CONFIG["max_tokens"], "max_words": 0})
+
+def _description_cache_key(text: str, mode: str, temperature: Optional[float] = None, seed: Optional[int] = None,
+                           model: Optional[str] = None) -> str:
+    """
+    Cache key covering every parameter that influences a single-item description
+    """
+    return _cache.make_cache_key(
+        model=model or OPENROUTER_CONFIG["model"],
+        prompt=get_prompt_fingerprint(mode),
+        temperature=OPENROUTER_CONFIG["temperature"] if temperature is None else temperature,
+        seed=seed,
+        max_tokens=_mode_budget(mode)["max_tokens"],
+        mode=mode,
+        text=text,
+    )
+
+def _description_namespace(mode: str, temperature: Optional[float] = None, seed: Optional[int] = None,
+                           model: Optional[str] = None) -> str:
+    """
+    Key of every request parameter except the text, grouping near-duplicate lookups
+    """
+    return _cache.make_cache_key(
+        model=model or OPENROUTER_CONFIG["model"],
+        prompt=get_prompt_fingerprint(mode),
+        temperature=OPENROUTER_CONFIG["temperature"] if temperature is None else temperature,
+        seed=seed,
+        mode=mode,
+    )
+
+def _lookup_cached_description(cache, text: str, mode: str, temperature: Optional[float] = None,
+                               seed: Optional[int] = None, model: Optional[str] = None) -> Optional[str]:
+    """
+    Exact cache lookup, then the near-duplicate index for slightly different prompts
+    """
+    started = time.perf_counter()
+    if cache is not None:
+        cached_description = cache.get(_description_cache_key(text, mode, temperature, seed, model))
+        if cached_description is not None:
+            record_call(mode, "success", "hit", time.perf_counter() - started)
+            return cached_description
+
+    index = _similarity.get_similarity_index(cache)
+    if index is not None:
+        similar_description = index.lookup(_description_namespace(mode, temperature, seed, model), text)
+        if similar_description is not None:
+            record_call(mode, "success", "similar", time.perf_counter() - started)
+        return similar_description
+    return None
+
+def _store_description(cache, text: str, mode: str, description: str, temperature: Optional[float] = None,
+                       seed: Optional[int] = None, model: Optional[str] = None) -> None:
+    """
+    Record a successful description in the persistent cache and the near-duplicate index
+    """
+    namespace = _description_namespace(mode, temperature, seed, model)
+    if cache is not None:
+        cache.put(_description_cache_key(text, mode, temperature, seed, model), description,
+                  mode=mode, text=text, namespace=namespace)
+    index = _similarity.get_similarity_index(cache)
+    if index is not None:
+        index.add(namespace, text, description)
+
+def sampling_params(deterministic: bool, seed: int) -> Tuple[Optional[float], Optional[int]]:
+    """
+    Temperature and seed overrides for a node: temperature 0 plus a fixed seed when deterministic
+    """
+    if deterministic:
+        return 0.0, seed
+    return None, None
+
+def generation_fingerprint(**inputs) -> str:
+    """
+    Stable IS_CHANGED fingerprint of a node's widget inputs and the configured model.
+    The API key, hidden inputs and non-primitive (linked tensor) inputs are excluded.
+    In background mode it also changes once the node's background jobs have finished,
+    so the next run picks up their results.
+    """
+    parts = {
+        name: value for name, value in inputs.items()
+        if name not in ("openrouter_api_key", "unique_id") and isinstance(value, (str, int, float, bool, type(None)))
+    }
+    if inputs.get("background_refresh"):
+        parts["background_version"] = _jobs.job_version(inputs.get("unique_id"))
+    return _cache.make_cache_key(model=OPENROUTER_CONFIG["model"], **parts)
+
+def determinism_inputs() -> dict:
+    """
+    Optional inputs shared by every generator node for deterministic generation
+    """
+    return {
+        "deterministic": ("BOOLEAN", {
+            "default": False,
+            "tooltip": "Temperature 0 plus a fixed seed so results are reproducible and cacheable / 确定性生成：温度为0并使用固定种子"
+        }),
+        "seed": ("INT", {
+            "default": 0,
+            "min": 0,
+            "max": 0xffffffff,
+            "tooltip": "Seed passed to the API in deterministic mode / 确定性模式下传给API的种子"
+        }),
+    }
+
+def engine_inputs() -> dict:
+    """
+    Optional input selecting the description engine
+    """
+    return {
+        "description_engine": (ENGINES, {
+            "default": ENGINE_API,
+            "tooltip": "Local lexicon, API, or local first with API fallback / 描述引擎：本地词库、API或本地优先"
+        }),
+    }
+
+def routing_inputs() -> dict:
+    """
+    Optional input pinning a node to one model instead of the fastest route target
+    """
+    return {
+        "model_override": ("STRING", {
+            "default": "",
+            "multiline": False,
+            "tooltip": "Use this model instead of the fastest configured target, empty routes automatically / 指定模型，留空则自动选择最快的端点"
+        }),
+    }
 
+def long_text_inputs() -> dict:
+    """
+    Optional input choosing how text longer than max_text_length is returned
+    """
+    return {
+        "long_text_output": (LONG_TEXT_OUTPUTS, {
+            "default": LONG_TEXT_MERGED,
+            "tooltip": "Long text is split into chunks described in parallel: merge them into one description or return one per chunk / 长文本分块并行生成：合并为一个描述或按块逐行输出"
+        }),
+    }
+
+def background_inputs() -> dict:
+    """
+    Optional input returning at once while descriptions are generated in the background
+    """
+    return {
+        "background_refresh": ("BOOLEAN", {
+            "default": False,
+            "tooltip": "Return the cached, stale or original text at once and generate the description in the background for the next run / 立即返回缓存、过期结果或原文，在后台生成描述供下次运行使用"
+        }),
+    }
+
+def requires_api_key(engine: str) -> bool:
+    """
+    Only the API-only engine needs a key up front; local-first asks for one when it falls back
+    """
+    return engine == ENGINE_API
+
+def describe_locally(text: str, mode: str) -> Optional[str]:
+    """
+    Describe text with the offline lexicon, or None when it is not covered
+    """
+    return get_lexicon_engine().describe(text, mode)
+
+def request_completion(user_prompt: str, api_key: str, mode: str, max_tokens: Optional[int] = None,
+                       stream: bool = False, on_partial: Optional[Callable[[str], None]] = None,
+                       temperature: Optional[float] = None, seed: Optional[int] = None,
+                       model: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    Send one chat completion request with the mode's system prompt and few-shot prefix
+    to the fastest healthy route target, or only to targets serving model when given.
+    Returns (success, content) on success or (False, error message) on failure.
+    With stream=True the completion is read as SSE and cut off once a full description arrived.
+    Raises CircuitOpenError without sending anything while every target's circuit is open.
+    """
+    started = time.perf_counter()
+    call_info = {}
     try:
-        headers = {
-            "Authorization": f"Bearer {api_key.strip()}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://comfyui.local",
-            "X-Title": "ComfyUI MMAudio Description Generator"
-        }
+        success, content = _request_completion(user_prompt, api_key, mode, max_tokens, stream, on_partial,
+                                               temperature, seed, model, call_info)
+    except CircuitOpenError:
+        record_call(mode, "circuit_open", "miss", time.perf_counter() - started, model=model or OPENROUTER_CONFIG["model"])
+        raise
 
-        # Use user input directly as audio description request
-        user_prompt = text
+    response = call_info.get("response")
+    # Network errors have no response; the raised exception carries the attempts instead
+    outcome_source = response if response is not None else call_info.get("error")
+    record_call(
+        mode, "success" if success else "error", "miss", time.perf_counter() - started,
+        timings=getattr(outcome_source, "timings", None),
+        usage=call_info.get("usage"),
+        retries=getattr(outcome_source, "retries", 0),
+        model=response.target.model if hasattr(response, "target") else (model or OPENROUTER_CONFIG["model"]),
+        status=response.status_code if response is not None else 0,
+        error=type(call_info["error"]).__name__ if "error" in call_info else "",
+    )
+    return success, content
 
+def _request_completion(user_prompt: str, api_key: str, mode: str, max_tokens: Optional[int],
+                        stream: bool, on_partial: Optional[Callable[[str], None]],
+                        temperature: Optional[float], seed: Optional[int], model: Optional[str],
+                        call_info: dict) -> Tuple[bool, str]:
+    """
+    Body of request_completion; the raw response and usage block are left in call_info
+    """
+    try:
+        requested_model = model or OPENROUTER_CONFIG["model"]
         data = {
-            "model": OPENROUTER_CONFIG["model"],
-            "messages": [
-                {
-                    "role": "system",
-                    "content": SYSTEM_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": user_prompt
-                }
-            ],
-            "max_tokens": OPENROUTER_CONFIG["max_tokens"],
-            "temperature": OPENROUTER_CONFIG["temperature"]
+            "model": requested_model,
+            "messages": build_messages(mode, user_prompt, requested_model),
+            "max_tokens": max_tokens or _mode_budget(mode)["max_tokens"],
+            "temperature": OPENROUTER_CONFIG["temperature"] if temperature is None else temperature
         }
+        if seed is not None:
+            data["seed"] = seed
+        if stream:
+            data["stream"] = True
+            data["stream_options"] = {"include_usage": True}
 
-        response = requests.post(
-            f"{OPENROUTER_CONFIG['base_url']}/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=OPENROUTER_CONFIG["timeout"]
-        )
+        response = _post_chat(data, api_key, stream, model,
+                              lambda target_model: build_messages(mode, user_prompt, target_model))
+        call_info["response"] = response
 
-        if response.status_code == 200:
+        if response.status_code == 200 and stream:
+            usage = {}
+            content = read_streamed_description(response, _mode_budget(mode)["max_words"], on_partial,
+                                                usage, STREAMING_CONFIG["usage_wait"])
+            call_info["usage"] = usage or None
+            if content:
+                return True, content
+            return False, f"API Response Error: Empty streamed response"
+        elif response.status_code == 200:
             result = response.json()
+            call_info["usage"] = result.get("usage")
             if "choices" in result and len(result["choices"]) > 0:
-                audio_description = result["choices"][0]["message"]["content"].strip()
-                return audio_description, "MMAudio"
+                return True, result["choices"][0]["message"]["content"].strip()
             else:
-                return f"API Response Error: No choices in response", mode
+                return False, f"API Response Error: No choices in response"
         elif response.status_code == 401:
-            return f"Authentication Error: Invalid API key", mode
+            return False, f"Authentication Error: Invalid API key"
         elif response.status_code == 429:
-            return f"Rate limit exceeded. Please try again later.", mode
+            return False, f"Rate limit exceeded. Please try again later."
         else:
             logging.error(f"OpenRouter API error: {response.status_code} - {response.text}")
-            return f"API Error {response.status_code}: {response.text}", mode
+            return False, f"API Error {response.status_code}: {response.text}"
 
-    except requests.exceptions.Timeout:
-        return f"Request timeout after {OPENROUTER_CONFIG['timeout']} seconds", mode
-    except requests.exceptions.RequestException as e:
-        return f"Request failed: {str(e)}", mode
+    except CircuitOpenError:
+        raise
+    except _requests.exceptions.Timeout as e:
+        call_info["error"] = e
+        return False, f"Request timeout after {OPENROUTER_CONFIG['timeout']} seconds"
+    except _requests.exceptions.RequestException as e:
+        call_info["error"] = e
+        return False, f"Request failed: {str(e)}"
     except Exception as e:
         logging.error(f"OpenRouter API call failed: {e}")
-        return f"Unexpected error: {str(e)}", mode
+        return False, f"Unexpected error: {str(e)}"
+
+def _post_chat(data: dict, api_key: str, stream: bool, model: Optional[str],
+               messages_for: Optional[Callable[[str], List[dict]]] = None):
+    """
+    Route one chat request. Node bodies started from an async entry point send it on
+    their event loop over the shared HTTP/2 client, so concurrent nodes multiplex one
+    connection; streaming requests and everything else use the pooled sync client.
+    """
+    loop = node_event_loop.get()
+    if loop is not None and not stream and loop.is_running() and _aclient.async_transport_available():
+        try:
+            running_loop = _asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        # Blocking on the loop from its own thread would deadlock
+        if running_loop is not loop:
+            return _asyncio.run_coroutine_threadsafe(_router.post_routed_chat_async(
+                data, api_key, model=model, messages_for=messages_for), loop).result()
+    return _router.post_routed_chat(data, api_key, stream=stream, model=model, messages_for=messages_for)
+
+def call_openrouter_api(text: str, api_key: str, mode: str = "audio_description", stream: Optional[bool] = None,
+                        on_partial: Optional[Callable[[str], None]] = None,
+                        temperature: Optional[float] = None, seed: Optional[int] = None,
+                        model: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Call OpenRouter API to generate audio descriptions.
+    While the upstream circuit is open this returns at once with a stale cached
+    description, or the original text when there is none.
+    """
+    if not api_key or not api_key.strip():
+        return "Error: API key is required", mode
+
+    cache = _cache.get_response_cache()
+    cached_description = _lookup_cached_description(cache, text, mode, temperature, seed, model)
+    if cached_description is not None:
+        return cached_description, "MMAudio"
+
+    if stream is None:
+        stream = STREAMING_CONFIG["enabled"]
+
+    def fetch() -> Tuple[bool, str]:
+        # Use user input directly as audio description request
+        success, content = request_completion(text, api_key, mode, stream=stream, on_partial=on_partial,
+                                              temperature=temperature, seed=seed, model=model)
+        # Only successful, non-empty descriptions are cached
+        if success and content:
+            _store_description(cache, text, mode, content, temperature, seed, model)
+        return success, content
+
+    # Identical requests already in flight are coalesced into one API call
+    cache_key = _description_cache_key(text, mode, temperature, seed, model)
+    try:
+        (success, content), _ = _in_flight_requests.do(f"{cache_key}:{hash(api_key.strip())}", fetch)
+    except CircuitOpenError as e:
+        return _circuit_open_fallback(cache, cache_key, text, mode, e)
+    if not success:
+        return content, mode
+    return content, "MMAudio"
+
+def _circuit_open_fallback(cache, cache_key: str, text: str, mode: str, error: CircuitOpenError) -> Tuple[str, str]:
+    """
+    Answer for a request rejected by an open circuit: the stale cached description, else the text itself
+    """
+    stale_description = cache.get(cache_key, allow_stale=True) if cache is not None else None
+    if stale_description is not None:
+        logging.warning(f"{error}; serving stale cached description")
+        record_call(mode, "success", "stale", 0.0)
+        return stale_description, "MMAudio"
+    logging.warning(f"{error}; returning the original text")
+    return text, mode
+
+def describe_text(text: str, api_key: str, mode: str = "audio_description", engine: str = ENGINE_API,
+                  long_text_output: str = LONG_TEXT_MERGED, background: bool = False, job_owner: Optional[str] = None,
+                  **api_options) -> Tuple[str, str]:
+    """
+    Generate an audio description with the chosen engine: the offline lexicon,
+    the API, or the lexicon first with the API as fallback.
+    Text longer than max_text_length goes through describe_long_text.
+    With background=True API requests go through describe_in_background instead.
+    """
+    is_long = len(text) > TRANSLATOR_CONFIG["max_text_length"]
+    # Per-chunk timeline output has no single cache entry to serve, so it stays synchronous
+    if background and engine != ENGINE_LOCAL and not (is_long and long_text_output == LONG_TEXT_TIMELINE):
+        return describe_in_background(text, api_key, mode, engine, long_text_output, job_owner, **api_options)
+
+    if is_long:
+        return describe_long_text(text, api_key, mode, engine, long_text_output, **api_options)
+
+    if engine != ENGINE_API:
+        started = time.perf_counter()
+        local_description = describe_locally(text, mode)
+        if local_description is not None:
+            record_call(mode, "success", "local", time.perf_counter() - started)
+            return local_description, "MMAudio"
+        if engine == ENGINE_LOCAL:
+            # Nothing matched locally: pass the text through unchanged
+            return text, mode
+    return call_openrouter_api(text, api_key, mode, **api_options)
+
+def describe_in_background(text: str, api_key: str, mode: str = "audio_description", engine: str = ENGINE_API,
+                           long_text_output: str = LONG_TEXT_MERGED, job_owner: Optional[str] = None,
+                           **api_options) -> Tuple[str, str]:
+    """
+    Stale-while-revalidate: return a fresh cached description, or queue a background job
+    and return the stale cached description or the original text as a placeholder.
+    job_owner (the node id) lets the node's IS_CHANGED notice when the job has finished.
+    """
+    temperature, seed, model = api_options.get("temperature"), api_options.get("seed"), api_options.get("model")
+    is_long = len(text) > TRANSLATOR_CONFIG["max_text_length"]
+
+    if engine != ENGINE_API and not is_long:
+        started = time.perf_counter()
+        local_description = describe_locally(text, mode)
+        if local_description is not None:
+            record_call(mode, "success", "local", time.perf_counter() - started)
+            return local_description, "MMAudio"
+
+    cache = _cache.get_response_cache()
+    job_queue = _jobs.get_job_queue(run_description_job) if cache is not None else None
+    if job_queue is None:
+        # Without a cache a background result could never be picked up
+        return describe_text(text, api_key, mode, engine, long_text_output, **api_options)
+
+    cache_key = _description_cache_key(text, mode, temperature, seed, model)
+    if is_long:
+        fresh_description = cache.get(cache_key)
+    else:
+        fresh_description = _lookup_cached_description(cache, text, mode, temperature, seed, model)
+    if fresh_description is not None:
+        return fresh_description, "MMAudio"
+
+    job_queue.submit(cache_key, {
+        "text": text,
+        "mode": mode,
+        "engine": engine,
+        "long_text_output": long_text_output,
+        "temperature": temperature,
+        "seed": seed,
+        "model": model,
+    }, api_key, job_owner)
+
+    stale_description = cache.get(cache_key, allow_stale=True)
+    if stale_description is not None:
+        record_call(mode, "success", "stale", 0.0)
+        return stale_description, "MMAudio"
+    return text, mode
+
+def run_description_job(payload: dict, api_key: str) -> bool:
+    """
+    Background job runner: generate and cache one description; True once a fresh result is cached
+    """
+    text, mode = payload["text"], payload["mode"]
+    temperature, seed, model = payload.get("temperature"), payload.get("seed"), payload.get("model")
+    describe_text(text, api_key, mode, payload.get("engine", ENGINE_API),
+                  payload.get("long_text_output", LONG_TEXT_MERGED),
+                  stream=False, temperature=temperature, seed=seed, model=model)
+    cache = _cache.get_response_cache()
+    return cache is not None and cache.get(_description_cache_key(text, mode, temperature, seed, model)) is not None
+
+def describe_long_text(text: str, api_key: str, mode: str = "audio_description", engine: str = ENGINE_API,
+                       output: str = LONG_TEXT_MERGED, **api_options) -> Tuple[str, str]:
+    """
+    Map-reduce for long text: describe scene and sentence chunks in parallel, then merge
+    them with one short request, or return one description per chunk, one per line
+    """
+    temperature, seed, model = api_options.get("temperature"), api_options.get("seed"), api_options.get("model")
+    cache = _cache.get_response_cache()
+    # Long texts only use the exact cache; shingling them for the near-duplicate index is too costly
+    merged_key = _description_cache_key(text, mode, temperature, seed, model)
+    if output == LONG_TEXT_MERGED and cache is not None:
+        cached_description = cache.get(merged_key)
+        if cached_description is not None:
+            return cached_description, "MMAudio"
+
+    chunks = split_chunks(text, TRANSLATOR_CONFIG["chunk_size"])
+    if len(chunks) > TRANSLATOR_CONFIG["max_chunks"]:
+        return (f"Text too long, exceeds {TRANSLATOR_CONFIG['max_chunks']} chunks of "
+                f"{TRANSLATOR_CONFIG['chunk_size']} characters"), mode
+
+    # Partial output of concurrent chunks would interleave, so only the merge step streams
+    chunk_options = dict(api_options, stream=False, on_partial=None)
+    results = run_batch(chunks, lambda chunk: describe_text(chunk, api_key, mode, engine, **chunk_options),
+                        TRANSLATOR_CONFIG["chunk_concurrency"])
+    if engine != ENGINE_LOCAL:
+        for chunk, (description, result_mode) in zip(chunks, results):
+            if result_mode == "MMAudio":
+                continue
+            # A failed chunk fails the whole text: serve the stale merged description if there is one
+            stale_description = (cache.get(merged_key, allow_stale=True)
+                                 if cache is not None and output == LONG_TEXT_MERGED else None)
+            if stale_description is not None:
+                logging.warning("Long text chunk failed; serving stale cached description")
+                record_call(mode, "success", "stale", 0.0)
+                return stale_description, "MMAudio"
+            # A chunk handed back unchanged was rejected by an open circuit: pass the whole text through
+            if description == chunk:
+                return text, mode
+            return description, result_mode
+
+    descriptions = [description for description, _ in results]
+    if output == LONG_TEXT_TIMELINE or len(descriptions) == 1 or engine == ENGINE_LOCAL:
+        return "\n".join(descriptions), "MMAudio"
+
+    stream = api_options.get("stream")
+    try:
+        success, content = request_completion(
+            build_reduce_prompt(descriptions), api_key, mode,
+            stream=STREAMING_CONFIG["enabled"] if stream is None else stream,
+            on_partial=api_options.get("on_partial"),
+            temperature=temperature, seed=seed, model=model
+        )
+    except CircuitOpenError as e:
+        return _circuit_open_fallback(cache, merged_key, text, mode, e)
+    if not success:
+        return content, mode
+    if cache is not None and content:
+        cache.put(merged_key, content, mode=mode)
+    return content, "MMAudio"
+
+def merge_layer_descriptions(layers: List[Tuple[str, str]], api_key: str, mode: str = "audio_description",
+                             merge_mode: str = MERGE_TEMPLATE, delimiter: str = ", ", **api_options) -> str:
+    """
+    Compose (layer name, description) pairs into one description: joined locally, or merged
+    by one short request. The merge request is cached on the exact element descriptions,
+    so it is only sent again when one of them changed.
+    """
+    template = compose_template([description for _, description in layers], delimiter)
+    if merge_mode != MERGE_API or len(layers) < 2:
+        return template
+
+    temperature, seed, model = api_options.get("temperature"), api_options.get("seed"), api_options.get("model")
+    merge_prompt = build_layer_merge_prompt(layers)
+    cache = _cache.get_response_cache()
+    # Exact cache only: merge prompts of similar mixes differ in just the layer that changed
+    merge_key = _description_cache_key(merge_prompt, mode, temperature, seed, model)
+    if cache is not None:
+        started = time.perf_counter()
+        cached_description = cache.get(merge_key)
+        if cached_description is not None:
+            record_call(mode, "success", "hit", time.perf_counter() - started)
+            return cached_description
+
+    try:
+        success, content = request_completion(merge_prompt, api_key, mode, temperature=temperature,
+                                              seed=seed, model=model)
+    except CircuitOpenError as e:
+        logging.warning(f"{e}; joining layer descriptions locally")
+        return template
+    if not success or not content:
+        logging.warning(f"Layer merge failed ({content}); joining layer descriptions locally")
+        return template
+    if cache is not None:
+        cache.put(merge_key, content, mode=mode)
+    return content
+
+def call_openrouter_api_packed(texts: List[str], api_key: str, mode: str = "audio_description",
+                               pack_size: int = 10, token_budget: int = 0, concurrency: int = 1,
+                               temperature: Optional[float] = None, seed: Optional[int] = None,
+                               model: Optional[str] = None) -> List[str]:
+    """
+    Describe many short inputs with one chat completion per pack, sharing the system prompt.
+    Entries missing from a packed answer fall back to individual calls.
+    """
+    if not api_key or not api_key.strip():
+        return ["Error: API key is required"] * len(texts)
+
+    cache = _cache.get_response_cache()
+    results: List[Optional[str]] = [None] * len(texts)
+    pending: List[int] = []
+    for index, text in enumerate(texts):
+        cached_description = _lookup_cached_description(cache, text, mode, temperature, seed, model)
+        if cached_description is not None:
+            results[index] = cached_description
+        else:
+            pending.append(index)
+
+    def describe_pack(pack: List[int]) -> None:
+        pack_texts = [texts[i] for i in pack]
+        if len(pack_texts) > 1:
+            max_tokens = TRANSLATOR_CONFIG["pack_tokens_per_item"] * len(pack_texts) + 32
+            try:
+                success, content = request_completion(build_packed_prompt(pack_texts), api_key, mode, max_tokens,
+                                                      temperature=temperature, seed=seed, model=model)
+            except CircuitOpenError:
+                # Individual calls below fall back to stale cache or the original text
+                success, content = False, ""
+            answers = parse_packed_response(content, len(pack_texts)) if success else [None] * len(pack_texts)
+        else:
+            answers = [None]
+
+        for index, answer in zip(pack, answers):
+            if answer is None:
+                results[index], _ = call_openrouter_api(texts[index], api_key, mode, temperature=temperature,
+                                                        seed=seed, model=model)
+            else:
+                results[index] = answer
+                _store_description(cache, texts[index], mode, answer, temperature, seed, model)
+
+    packs = [[pending[i] for i in pack] for pack in make_packs([texts[i] for i in pending], pack_size, token_budget)]
+    if concurrency > 1 and len(packs) > 1:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(packs)), thread_name_prefix="mmaudio-pack") as executor:
+            # Worker threads keep the calling node attribution for metrics
+            context = contextvars.copy_context()
+            list(executor.map(lambda pack: context.copy().run(describe_pack, pack), packs))
+    else:
+        for pack in packs:
+            describe_pack(pack)
+
+    return [result if result is not None else "" for result in results]
+
+_node_executor = None
+_node_executor_lock = threading.Lock()
+
+def _get_node_executor() -> ThreadPoolExecutor:
+    # Node bodies block on requests running on the event loop, so they must not occupy
+    # the loop's default executor, which the async client waits on
+    global _node_executor
+    if _node_executor is None:
+        with _node_executor_lock:
+            if _node_executor is None:
+                _node_executor = ThreadPoolExecutor(max_workers=ASYNC_CONFIG["node_workers"],
+                                                    thread_name_prefix="mmaudio-node")
+    return _node_executor
+
+async def run_node_async(method: Callable, **inputs):
+    """
+    Async node entry point: run the node body in a worker thread so independent nodes
+    overlap their network waits, with its API requests sent on the running event loop
+    """
+    loop = _asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    context.run(node_event_loop.set, loop)
+    return await loop.run_in_executor(_get_node_executor(), lambda: context.run(method, **inputs))
+
+async def describe_text_async(text: str, api_key: str, mode: str = "audio_description", **options) -> Tuple[str, str]:
+    """
+    Awaitable describe_text for asyncio callers, with the same caching and fallbacks
+    """
+    return await run_node_async(describe_text, text=text, api_key=api_key, mode=mode, **options)
+
+def send_progress_text(node_id: Optional[str], text: str) -> None:
+    """
+    Show partial text on a node in the ComfyUI frontend, when the server supports it
+    """
+    if node_id is None:
+        return
+    try:
+        from server import PromptServer
+        PromptServer.instance.send_progress_text(text, node_id)
+    except Exception:
+        # Older ComfyUI builds or running outside ComfyUI
+        pass
 
 # Audio description mode mapping
 AUDIO_MODES = {
@@ -138,46 +728,99 @@ class StringMultilineTranslator:
                     "default": True,
                     "tooltip": "Enable audio description generation / 启用音频描述生成"
                 }),
+            },
+            "optional": {
+                "batch_mode": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Describe each line (or delimited item) separately / 按行（或分隔符）批量生成描述"
+                }),
+                "batch_delimiter": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "tooltip": "Item delimiter for batch mode, empty means one item per line / 批量模式分隔符，留空则按行分割"
+                }),
+                "concurrency": ("INT", {
+                    "default": TRANSLATOR_CONFIG["batch_concurrency"],
+                    "min": 1,
+                    "max": 64,
+                    "tooltip": "Concurrent requests in batch mode / 批量模式并发请求数"
+                }),
+                "pack_size": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 100,
+                    "tooltip": "Items packed into one API request in batch mode, 1 disables packing / 批量模式下每个请求打包的条目数，1为不打包"
+                }),
+                **determinism_inputs(),
+                **engine_inputs(),
+                **routing_inputs(),
+                **long_text_inputs(),
+                **background_inputs(),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
-    RETURN_TYPES = ("STRING", "STRING", "STRING")
-    RETURN_NAMES = ("original_text", "audio_description", "mode")
-    FUNCTION = "execute"
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("original_text", "audio_description", "mode", "audio_descriptions")
+    OUTPUT_IS_LIST = (False, False, False, True)
+    FUNCTION = "execute_async" if ASYNC_CONFIG["async_nodes"] else "execute"
     CATEGORY = "音频处理/Audio Processing"
     DESCRIPTION = "MMAudio audio description generator / MMAudio专用音频描述生成节点，支持背景音乐、环境音效、人声配音等"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        return generation_fingerprint(**kwargs)
     
-    def __init__(self):
-        self.last_request_time = 0
-    
-    def execute(self, text: str, openrouter_api_key: str, audio_mode: str, enable_generation: bool) -> Tuple[str, str, str]:
+    async def execute_async(self, **inputs):
+        return await run_node_async(self.execute, **inputs)
+
+    @track_node
+    def execute(self, text: str, openrouter_api_key: str, audio_mode: str, enable_generation: bool,
+                batch_mode: bool = False, batch_delimiter: str = "", concurrency: int = 4,
+                pack_size: int = 1, deterministic: bool = False, seed: int = 0,
+                description_engine: str = ENGINE_API, model_override: str = "",
+                long_text_output: str = LONG_TEXT_MERGED, background_refresh: bool = False,
+                unique_id: Optional[str] = None) -> Tuple[str, str, str, List[str]]:
         original_text = text
         audio_description = text
         mode = audio_mode
+        temperature, api_seed = sampling_params(deterministic, seed)
+        model = model_override.strip() or None
+
+        if enable_generation and batch_mode and text.strip():
+            if requires_api_key(description_engine) and (not openrouter_api_key or not openrouter_api_key.strip()):
+                audio_description = "Error: OpenRouter API key is required"
+                return (original_text, audio_description, mode, [audio_description])
+
+            descriptions = self.execute_batch(text, openrouter_api_key, batch_delimiter, concurrency, pack_size,
+                                              temperature, api_seed, AUDIO_MODES.get(audio_mode, "audio_description"),
+                                              description_engine, model, long_text_output,
+                                              background_refresh, unique_id)
+            logging.info(f"Batch audio descriptions generated for mode: {audio_mode} ({len(descriptions)} items)")
+            return (original_text, "\n".join(descriptions), mode, descriptions)
 
         if enable_generation and text.strip():
             try:
                 # Check API key
-                if not openrouter_api_key or not openrouter_api_key.strip():
+                if requires_api_key(description_engine) and (not openrouter_api_key or not openrouter_api_key.strip()):
                     audio_description = "Error: OpenRouter API key is required"
-                    return (original_text, audio_description, mode)
+                    return (original_text, audio_description, mode, [audio_description])
 
-                # Check text length
-                if len(text) > TRANSLATOR_CONFIG["max_text_length"]:
-                    audio_description = f"Text too long, exceeds {TRANSLATOR_CONFIG['max_text_length']} character limit"
-                    return (original_text, audio_description, mode)
-
-                # Control request frequency
-                current_time = time.time()
-                time_since_last = current_time - self.last_request_time
-                if time_since_last < TRANSLATOR_CONFIG["request_interval"]:
-                    time.sleep(TRANSLATOR_CONFIG["request_interval"] - time_since_last)
-
-                # Generate audio description
-                audio_description, detected_mode = call_openrouter_api(text, openrouter_api_key, "audio_description")
-                self.last_request_time = time.time()
+                # Generate audio description (request frequency is controlled by the shared client)
+                audio_description, detected_mode = describe_text(
+                    text, openrouter_api_key, AUDIO_MODES.get(audio_mode, "audio_description"),
+                    engine=description_engine, long_text_output=long_text_output,
+                    background=background_refresh, job_owner=unique_id,
+                    temperature=temperature, seed=api_seed, model=model
+                )
 
                 logging.info(f"Audio description generated for mode: {audio_mode}")
+                if detected_mode == "MMAudio" and long_text_output == LONG_TEXT_TIMELINE \
+                        and len(text) > TRANSLATOR_CONFIG["max_text_length"]:
+                    # One list entry per chunk
+                    return (original_text, audio_description, mode, audio_description.split("\n"))
 
             except Exception as e:
                 logging.error(f"Audio description generation failed: {e}")
@@ -186,8 +829,58 @@ class StringMultilineTranslator:
         elif enable_generation and not text.strip():
             audio_description = "Please input text content for audio description generation"
 
-        return (original_text, audio_description, mode)
-    
+        return (original_text, audio_description, mode, [audio_description])
+
+    def execute_batch(self, text: str, openrouter_api_key: str, batch_delimiter: str, concurrency: int,
+                      pack_size: int = 1, temperature: Optional[float] = None, seed: Optional[int] = None,
+                      mode_key: str = "audio_description", engine: str = ENGINE_API,
+                      model: Optional[str] = None, long_text_output: str = LONG_TEXT_MERGED,
+                      background: bool = False, job_owner: Optional[str] = None) -> List[str]:
+        """
+        Describe every non-blank item concurrently, preserving input order.
+        Background jobs run one item per request, so packing is skipped in background mode.
+        """
+        def describe(item: str) -> str:
+            try:
+                description, _ = describe_text(item, openrouter_api_key, mode_key, engine=engine,
+                                               long_text_output=long_text_output,
+                                               background=background, job_owner=job_owner,
+                                               temperature=temperature, seed=seed, model=model)
+                return description
+            except Exception as e:
+                logging.error(f"Batch audio description generation failed: {e}")
+                return f"Generation failed: {str(e)}"
+
+        items = split_items(text, batch_delimiter)
+        if pack_size > 1 and not background:
+            unique_items = list(dict.fromkeys(items))
+            # Long items are chunked on their own instead of being packed
+            results = {item: describe(item) for item in unique_items if len(item) > TRANSLATOR_CONFIG["max_text_length"]}
+            unique_items = [item for item in unique_items if item not in results]
+            if engine != ENGINE_API:
+                for item in unique_items:
+                    local_description = describe_locally(item, mode_key)
+                    if local_description is not None or engine == ENGINE_LOCAL:
+                        results[item] = local_description if local_description is not None else item
+                unique_items = [item for item in unique_items if item not in results]
+            try:
+                packed = call_openrouter_api_packed(
+                    unique_items, openrouter_api_key, mode_key,
+                    pack_size=pack_size,
+                    token_budget=TRANSLATOR_CONFIG["pack_token_budget"],
+                    concurrency=concurrency,
+                    temperature=temperature,
+                    seed=seed,
+                    model=model,
+                )
+            except Exception as e:
+                logging.error(f"Packed audio description generation failed: {e}")
+                packed = [f"Generation failed: {str(e)}"] * len(unique_items)
+            results.update(zip(unique_items, packed))
+            descriptions = [results[item] for item in items]
+        else:
+            descriptions = run_batch(items, describe, concurrency)
+        return descriptions
 
 
 class StringConcatenateTranslator:
@@ -223,19 +916,40 @@ class StringConcatenateTranslator:
                 "audio_mode": (list(AUDIO_MODES.keys()), {
                     "default": "音频描述"
                 }),
+            },
+            "optional": {
+                **determinism_inputs(),
+                **engine_inputs(),
+                **routing_inputs(),
+                **long_text_inputs(),
+                **background_inputs(),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
     RETURN_TYPES = ("STRING", "STRING")
     RETURN_NAMES = ("concatenated_text", "audio_description")
-    FUNCTION = "execute"
+    FUNCTION = "execute_async" if ASYNC_CONFIG["async_nodes"] else "execute"
     CATEGORY = "音频处理/Audio Processing"
     DESCRIPTION = "Combine multiple audio element descriptions / 连接多个音频元素描述，生成组合音频描述"
     
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        return generation_fingerprint(**kwargs)
+
     def __init__(self):
         pass
     
-    def execute(self, string_a: str, string_b: str, openrouter_api_key: str, delimiter: str, generate_description: bool, audio_mode: str) -> Tuple[str, str]:
+    async def execute_async(self, **inputs):
+        return await run_node_async(self.execute, **inputs)
+
+    @track_node
+    def execute(self, string_a: str, string_b: str, openrouter_api_key: str, delimiter: str, generate_description: bool, audio_mode: str,
+                deterministic: bool = False, seed: int = 0, description_engine: str = ENGINE_API,
+                model_override: str = "", long_text_output: str = LONG_TEXT_MERGED,
+                background_refresh: bool = False, unique_id: Optional[str] = None) -> Tuple[str, str]:
         # Concatenate strings
         concatenated = delimiter.join([string_a, string_b])
         audio_description = concatenated
@@ -243,10 +957,16 @@ class StringConcatenateTranslator:
         # Generate audio description if enabled
         if generate_description and concatenated.strip():
             try:
-                if not openrouter_api_key or not openrouter_api_key.strip():
+                if requires_api_key(description_engine) and (not openrouter_api_key or not openrouter_api_key.strip()):
                     audio_description = "Error: OpenRouter API key is required"
                 else:
-                    audio_description, _ = call_openrouter_api(concatenated, openrouter_api_key, "audio_description")
+                    temperature, api_seed = sampling_params(deterministic, seed)
+                    audio_description, _ = describe_text(
+                        concatenated, openrouter_api_key, AUDIO_MODES.get(audio_mode, "audio_description"),
+                        engine=description_engine, long_text_output=long_text_output,
+                        background=background_refresh, job_owner=unique_id,
+                        temperature=temperature, seed=api_seed, model=model_override.strip() or None
+                    )
             except Exception as e:
                 logging.error(f"Audio description generation failed: {e}")
                 audio_description = f"Generation failed: {str(e)}"
@@ -288,30 +1008,76 @@ class StringReplaceTranslator:
                 "audio_mode": (list(AUDIO_MODES.keys()), {
                     "default": "音频描述"
                 }),
+            },
+            "optional": {
+                **determinism_inputs(),
+                **engine_inputs(),
+                **routing_inputs(),
+                **long_text_inputs(),
+                **background_inputs(),
+                "rules": ("STRING", {
+                    "default": "",
+                    "multiline": True,
+                    "tooltip": "Replacement rules, one 'find => replace' per line, 're:' prefix for regex / 替换规则，每行一条“查找 => 替换”，以re:开头表示正则"
+                }),
+                "rules_file": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "tooltip": "Optional rules file (same line format, or .json) / 可选的规则文件（相同格式或JSON）"
+                }),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
     RETURN_TYPES = ("STRING", "STRING")
     RETURN_NAMES = ("replaced_text", "audio_description")
-    FUNCTION = "execute"
+    FUNCTION = "execute_async" if ASYNC_CONFIG["async_nodes"] else "execute"
     CATEGORY = "音频处理/Audio Processing"
     DESCRIPTION = "Replace elements in audio descriptions / 替换音频描述中的元素，生成新的音频描述"
     
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # Editing the rules file must re-run the node even though its path is unchanged
+        return generation_fingerprint(rules_file_stamp=rules_file_stamp(kwargs.get("rules_file") or ""), **kwargs)
+
     def __init__(self):
         pass
     
-    def execute(self, text: str, find: str, replace: str, openrouter_api_key: str, generate_description: bool, audio_mode: str) -> Tuple[str, str]:
-        # Execute replacement
-        replaced_text = text.replace(find, replace)
+    async def execute_async(self, **inputs):
+        return await run_node_async(self.execute, **inputs)
+
+    @track_node
+    def execute(self, text: str, find: str, replace: str, openrouter_api_key: str, generate_description: bool, audio_mode: str,
+                deterministic: bool = False, seed: int = 0, description_engine: str = ENGINE_API,
+                model_override: str = "", long_text_output: str = LONG_TEXT_MERGED,
+                background_refresh: bool = False, unique_id: Optional[str] = None,
+                rules: str = "", rules_file: str = "") -> Tuple[str, str]:
+        # Apply find/replace and every rule in one scan (compiled rule sets are reused)
+        try:
+            replaced_text, _ = get_replacer(rules, rules_file, find, replace).apply(text)
+        except (OSError, ValueError) as e:
+            logging.error(f"Replacement rules failed: {e}")
+            return (text, f"Replacement rules error: {str(e)}")
         audio_description = replaced_text
 
+        if generate_description and replaced_text.strip() and replaced_text == text:
+            # Nothing was replaced: the text passes through without a request
+            logging.info("No replacement rule matched, skipping description generation")
         # Generate audio description if enabled
-        if generate_description and replaced_text.strip():
+        elif generate_description and replaced_text.strip():
             try:
-                if not openrouter_api_key or not openrouter_api_key.strip():
+                if requires_api_key(description_engine) and (not openrouter_api_key or not openrouter_api_key.strip()):
                     audio_description = "Error: OpenRouter API key is required"
                 else:
-                    audio_description, _ = call_openrouter_api(replaced_text, openrouter_api_key, "audio_description")
+                    temperature, api_seed = sampling_params(deterministic, seed)
+                    audio_description, _ = describe_text(
+                        replaced_text, openrouter_api_key, AUDIO_MODES.get(audio_mode, "audio_description"),
+                        engine=description_engine, long_text_output=long_text_output,
+                        background=background_refresh, job_owner=unique_id,
+                        temperature=temperature, seed=api_seed, model=model_override.strip() or None
+                    )
             except Exception as e:
                 logging.error(f"Audio description generation failed: {e}")
                 audio_description = f"Generation failed: {str(e)}"
@@ -333,16 +1099,36 @@ class WanVideoToMMAudioBridge:
                 }),
                 "audio_mode": (list(AUDIO_MODES.keys()), {"default": "音频描述"}),
                 "enable_generation": ("BOOLEAN", {"default": True}),
+            },
+            "optional": {
+                **determinism_inputs(),
+                **engine_inputs(),
+                **routing_inputs(),
+                **long_text_inputs(),
+                **background_inputs(),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
     RETURN_TYPES = ("STRING", "STRING", "STRING")
     RETURN_NAMES = ("original_text", "audio_description", "mode")
-    FUNCTION = "bridge_to_mmaudio"
+    FUNCTION = "bridge_to_mmaudio_async" if ASYNC_CONFIG["async_nodes"] else "bridge_to_mmaudio"
     CATEGORY = "音频处理/Audio Processing"
     DESCRIPTION = "Bridge WanVideoTextEncode output to MMAudio format / 将WanVideoTextEncode输出桥接到MMAudio格式"
 
-    def bridge_to_mmaudio(self, wan_text_embeds, openrouter_api_key, audio_mode="音频描述", enable_generation=True):
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        return generation_fingerprint(**kwargs)
+
+    async def bridge_to_mmaudio_async(self, **inputs):
+        return await run_node_async(self.bridge_to_mmaudio, **inputs)
+
+    @track_node
+    def bridge_to_mmaudio(self, wan_text_embeds, openrouter_api_key, audio_mode="音频描述", enable_generation=True,
+                          deterministic=False, seed=0, description_engine=ENGINE_API, model_override="",
+                          long_text_output=LONG_TEXT_MERGED, background_refresh=False, unique_id=None):
         try:
             original_text = ""
 
@@ -355,11 +1141,14 @@ class WanVideoToMMAudioBridge:
                     original_text = str(wan_text_embeds["prompt"])
                 elif "positive_prompt" in wan_text_embeds:
                     original_text = str(wan_text_embeds["positive_prompt"])
-                elif "prompt_embeds" in wan_text_embeds:
-                    # If only embeddings available, use a generic description
-                    original_text = "Video scene with visual elements requiring audio description"
-                elif "positive_prompt_embeds" in wan_text_embeds:
-                    original_text = "Positive video scene requiring audio enhancement"
+                elif "prompt_embeds" in wan_text_embeds or "positive_prompt_embeds" in wan_text_embeds:
+                    # Only embeddings available: recover the prompt recorded by WanVideoPromptRecorder
+                    original_text = get_embedding_registry().lookup(embeds_fingerprint(wan_text_embeds)) or ""
+                    if not original_text:
+                        logging.warning("No prompt recorded for these embeddings; add a WanVideo Prompt Recorder "
+                                        "after WanVideoTextEncode so the bridge can recover the text")
+                        placeholder = "Video scene with visual elements requiring audio description"
+                        return (placeholder, placeholder, audio_mode)
                 else:
                     # Fallback: try to extract any string values from the dict
                     text_values = []
@@ -383,13 +1172,19 @@ class WanVideoToMMAudioBridge:
             if not enable_generation:
                 return (original_text, original_text, audio_mode)
 
-            if not openrouter_api_key or not openrouter_api_key.strip():
+            if requires_api_key(description_engine) and (not openrouter_api_key or not openrouter_api_key.strip()):
                 return (original_text, "Error: OpenRouter API key is required", audio_mode)
 
             mode_key = AUDIO_MODES.get(audio_mode, "audio_description")
 
             try:
-                audio_description, detected_mode = call_openrouter_api(original_text, openrouter_api_key, mode_key)
+                temperature, api_seed = sampling_params(deterministic, seed)
+                audio_description, detected_mode = describe_text(
+                    original_text, openrouter_api_key, mode_key,
+                    engine=description_engine, long_text_output=long_text_output,
+                    background=background_refresh, job_owner=unique_id,
+                    temperature=temperature, seed=api_seed, model=model_override.strip() or None
+                )
                 return (original_text, audio_description, detected_mode)
             except Exception as api_error:
                 print(f"API call failed: {api_error}")
@@ -400,6 +1195,34 @@ class WanVideoToMMAudioBridge:
             print(error_msg)
             return ("Error", error_msg, audio_mode)
 
+class WanVideoPromptRecorder:
+    """Passes WanVideo text embeddings through and records their prompt for the bridge"""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "text_embeds": ("WANVIDEOTEXTEMBEDS", {"tooltip": "Text embeddings from WanVideoTextEncode / WanVideoTextEncode的文本嵌入"}),
+                "prompt": ("STRING", {
+                    "default": "",
+                    "multiline": True,
+                    "tooltip": "The prompt that was encoded, connect the same text as WanVideoTextEncode / 被编码的提示词，连接与WanVideoTextEncode相同的文本"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("WANVIDEOTEXTEMBEDS", "STRING")
+    RETURN_NAMES = ("text_embeds", "prompt")
+    FUNCTION = "record"
+    CATEGORY = "音频处理/Audio Processing"
+    DESCRIPTION = "Record the prompt of WanVideo text embeddings so the MMAudio bridge can recover it / 记录文本嵌入对应的提示词，供桥接节点还原文本"
+
+    def record(self, text_embeds, prompt: str):
+        fingerprint = embeds_fingerprint(text_embeds)
+        if fingerprint is not None and prompt.strip():
+            get_embedding_registry().record(fingerprint, prompt.strip())
+        return (text_embeds, prompt)
+
 class MMAudioPreviewGenerator:
     """MMAudio preview and testing node"""
 
@@ -423,19 +1246,42 @@ class MMAudioPreviewGenerator:
                     "default": True,
                     "tooltip": "Enable audio description generation / 启用音频描述生成"
                 }),
+            },
+            "optional": {
+                "stream_preview": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Stream the description and show partial output while it arrives / 流式生成并实时显示部分结果"
+                }),
+                **determinism_inputs(),
+                **engine_inputs(),
+                **routing_inputs(),
+                **long_text_inputs(),
+                **background_inputs(),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
     RETURN_TYPES = ("STRING", "STRING", "STRING")
     RETURN_NAMES = ("original_text", "audio_description", "mode")
-    FUNCTION = "preview_generate"
+    FUNCTION = "preview_generate_async" if ASYNC_CONFIG["async_nodes"] else "preview_generate"
     CATEGORY = "音频处理/Audio Processing"
     DESCRIPTION = "Preview and test MMAudio descriptions / 预览和测试MMAudio描述生成"
 
-    def __init__(self):
-        self.last_request_time = 0
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        return generation_fingerprint(**kwargs)
+
+    async def preview_generate_async(self, **inputs):
+        return await run_node_async(self.preview_generate, **inputs)
 
-    def preview_generate(self, text: str, openrouter_api_key: str, audio_mode: str, enable_generation: bool) -> tuple[str, str, str]:
+    @track_node
+    def preview_generate(self, text: str, openrouter_api_key: str, audio_mode: str, enable_generation: bool,
+                         stream_preview: bool = True, deterministic: bool = False, seed: int = 0,
+                         description_engine: str = ENGINE_API, model_override: str = "",
+                         long_text_output: str = LONG_TEXT_MERGED, background_refresh: bool = False,
+                         unique_id: Optional[str] = None) -> tuple[str, str, str]:
         original_text = text.strip()
         audio_description = original_text
         mode = audio_mode
@@ -446,25 +1292,19 @@ class MMAudioPreviewGenerator:
         if enable_generation:
             try:
                 # Check API key
-                if not openrouter_api_key or not openrouter_api_key.strip():
+                if requires_api_key(description_engine) and (not openrouter_api_key or not openrouter_api_key.strip()):
                     audio_description = "Error: OpenRouter API key is required"
                     return (original_text, audio_description, mode)
 
-                # Check text length
-                if len(text) > TRANSLATOR_CONFIG["max_text_length"]:
-                    audio_description = f"Text too long, exceeds {TRANSLATOR_CONFIG['max_text_length']} character limit"
-                    return (original_text, audio_description, mode)
-
-                # Control request frequency
-                import time
-                current_time = time.time()
-                time_since_last = current_time - self.last_request_time
-                if time_since_last < TRANSLATOR_CONFIG["request_interval"]:
-                    time.sleep(TRANSLATOR_CONFIG["request_interval"] - time_since_last)
-
-                # Generate audio description
-                audio_description, detected_mode = call_openrouter_api(text, openrouter_api_key, "audio_description")
-                self.last_request_time = time.time()
+                # Generate audio description (request frequency is controlled by the shared client)
+                on_partial = (lambda partial: send_progress_text(unique_id, partial)) if stream_preview else None
+                temperature, api_seed = sampling_params(deterministic, seed)
+                audio_description, detected_mode = describe_text(
+                    text, openrouter_api_key, AUDIO_MODES.get(audio_mode, "audio_description"),
+                    engine=description_engine, long_text_output=long_text_output,
+                    background=background_refresh, job_owner=unique_id,
+                    stream=stream_preview, on_partial=on_partial, temperature=temperature, seed=api_seed, model=model_override.strip() or None
+                )
 
                 logging.info(f"Preview audio description generated for mode: {audio_mode}")
                 mode = detected_mode
@@ -475,13 +1315,251 @@ class MMAudioPreviewGenerator:
 
         return (original_text, audio_description, mode)
 
+class MMAudioTimelineGenerator:
+    """Per-segment audio descriptions for multi-shot videos, returned in timeline order"""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "segments": ("STRING", {
+                    "default": "",
+                    "multiline": True,
+                    "dynamicPrompts": False,
+                    "tooltip": "Timeline as JSON [{\"start\": 0, \"end\": 3, \"text\": \"...\"}], SRT blocks or lines like '0:00-0:03 text' / 时间轴：JSON、SRT或每行“开始-结束 文本”"
+                }),
+                "openrouter_api_key": ("STRING", {
+                    "default": "",
+                    "tooltip": "OpenRouter API Key (sk-or-v1-...) / OpenRouter API密钥"
+                }),
+                "audio_mode": (list(AUDIO_MODES.keys()), {
+                    "default": "音频描述"
+                }),
+                "enable_generation": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Enable audio description generation / 启用音频描述生成"
+                }),
+            },
+            "optional": {
+                "concurrency": ("INT", {
+                    "default": TRANSLATOR_CONFIG["batch_concurrency"],
+                    "min": 1,
+                    "max": 64,
+                    "tooltip": "Segments described concurrently / 并发生成的片段数"
+                }),
+                **determinism_inputs(),
+                **engine_inputs(),
+                **routing_inputs(),
+                **background_inputs(),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "FLOAT", "FLOAT", "FLOAT", "STRING")
+    RETURN_NAMES = ("audio_descriptions", "start_times", "end_times", "durations", "timeline_json")
+    OUTPUT_IS_LIST = (True, True, True, True, False)
+    FUNCTION = "generate_timeline_async" if ASYNC_CONFIG["async_nodes"] else "generate_timeline"
+    CATEGORY = "音频处理/Audio Processing"
+    DESCRIPTION = "Describe every timeline segment concurrently, in timeline order / 按时间轴并行生成每个片段的音频描述"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        return generation_fingerprint(**kwargs)
+
+    async def generate_timeline_async(self, **inputs):
+        return await run_node_async(self.generate_timeline, **inputs)
+
+    @track_node
+    def generate_timeline(self, segments: str, openrouter_api_key: str, audio_mode: str, enable_generation: bool,
+                          concurrency: int = 4, deterministic: bool = False, seed: int = 0,
+                          description_engine: str = ENGINE_API, model_override: str = "",
+                          background_refresh: bool = False, unique_id: Optional[str] = None):
+        try:
+            parsed = parse_segments(segments)
+        except ValueError as e:
+            error = f"Timeline parse error: {e}"
+            return ([error], [0.0], [0.0], [0.0], json.dumps({"error": error}, ensure_ascii=False))
+        if not parsed:
+            message = "Please input timeline segments / 请输入时间轴片段"
+            return ([message], [0.0], [0.0], [0.0], "[]")
+
+        starts = [segment["start"] for segment in parsed]
+        ends = [segment["end"] for segment in parsed]
+        durations = [end - start for start, end in zip(starts, ends)]
+        texts = [segment["text"] for segment in parsed]
+
+        if not enable_generation:
+            descriptions = texts
+        elif requires_api_key(description_engine) and (not openrouter_api_key or not openrouter_api_key.strip()):
+            descriptions = ["Error: OpenRouter API key is required"] * len(parsed)
+        else:
+            temperature, api_seed = sampling_params(deterministic, seed)
+            mode_key = AUDIO_MODES.get(audio_mode, "audio_description")
+
+            def describe(text: str) -> str:
+                if not text:
+                    return ""
+                try:
+                    # Unchanged segments are served from the cache, so editing one shot costs one request
+                    description, _ = describe_text(text, openrouter_api_key, mode_key, engine=description_engine,
+                                                   background=background_refresh, job_owner=unique_id,
+                                                   temperature=temperature, seed=api_seed,
+                                                   model=model_override.strip() or None)
+                    return description
+                except Exception as e:
+                    logging.error(f"Timeline segment description failed: {e}")
+                    return f"Generation failed: {str(e)}"
+
+            descriptions = []
+            for index, description in iter_ordered(texts, describe, concurrency):
+                descriptions.append(description)
+                send_progress_text(unique_id, "\n".join(
+                    f"[{format_timestamp(starts[i])}-{format_timestamp(ends[i])}] {descriptions[i]}"
+                    for i in range(index + 1)
+                ))
+            logging.info(f"Timeline audio descriptions generated for mode: {audio_mode} ({len(descriptions)} segments)")
+
+        timeline_json = json.dumps([
+            {"start": start, "end": end, "text": text, "description": description}
+            for start, end, text, description in zip(starts, ends, texts, descriptions)
+        ], ensure_ascii=False)
+        return (descriptions, starts, ends, durations, timeline_json)
+
+class AudioDescriptionLayerCombiner:
+    """Layered audio description combiner: each element is described on its own, then merged"""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        element_tooltips = {
+            "music": "Background music element, described as music / 背景音乐元素",
+            "ambience": "Ambience element, described as ambient sound / 环境音元素",
+            "voice": "Voice element, described as voice narration / 人声元素",
+            "effects": "Sound effects element, described as special effects / 音效元素",
+        }
+        return {
+            "required": {
+                "openrouter_api_key": ("STRING", {
+                    "default": "",
+                    "tooltip": "OpenRouter API Key (sk-or-v1-...) / OpenRouter API密钥"
+                }),
+                "audio_mode": (list(AUDIO_MODES.keys()), {
+                    "default": "音频描述",
+                    "tooltip": "Mode for extra elements and the API merge / 额外元素与API合并使用的模式"
+                }),
+                "merge_mode": (MERGE_MODES, {
+                    "default": MERGE_TEMPLATE,
+                    "tooltip": "Join element descriptions locally, or merge them with one short API call / 本地拼接各元素描述，或用一次简短的API调用合并"
+                }),
+                "delimiter": ("STRING", {
+                    "default": ", ",
+                    "multiline": False,
+                    "tooltip": "Delimiter for the template merge / 本地拼接使用的连接符"
+                }),
+                "generate_description": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Generate audio descriptions for the elements / 是否为各元素生成音频描述"
+                }),
+            },
+            "optional": {
+                **{
+                    name: ("STRING", {"default": "", "multiline": True, "tooltip": element_tooltips[name]})
+                    for name, _ in LAYER_ELEMENTS
+                },
+                "extra_elements": ("STRING", {
+                    "default": "",
+                    "multiline": True,
+                    "tooltip": "More elements, one per line, described in audio_mode / 更多元素，每行一个，按所选模式生成"
+                }),
+                "concurrency": ("INT", {
+                    "default": TRANSLATOR_CONFIG["batch_concurrency"],
+                    "min": 1,
+                    "max": 64,
+                    "tooltip": "Elements described concurrently / 并发生成的元素数"
+                }),
+                **determinism_inputs(),
+                **engine_inputs(),
+                **routing_inputs(),
+                **background_inputs(),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING")
+    RETURN_NAMES = ("combined_text", "audio_description", "element_descriptions")
+    OUTPUT_IS_LIST = (False, False, True)
+    FUNCTION = "combine_async" if ASYNC_CONFIG["async_nodes"] else "combine"
+    CATEGORY = "音频处理/Audio Processing"
+    DESCRIPTION = "Describe each audio layer separately through the cache, then merge them / 分别生成各音频层的描述（走缓存）后合并"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        return generation_fingerprint(**kwargs)
+
+    async def combine_async(self, **inputs):
+        return await run_node_async(self.combine, **inputs)
+
+    @track_node
+    def combine(self, openrouter_api_key: str, audio_mode: str, merge_mode: str, delimiter: str,
+                generate_description: bool, music: str = "", ambience: str = "", voice: str = "", effects: str = "",
+                extra_elements: str = "", concurrency: int = 4, deterministic: bool = False, seed: int = 0,
+                description_engine: str = ENGINE_API, model_override: str = "", background_refresh: bool = False,
+                unique_id: Optional[str] = None) -> Tuple[str, str, List[str]]:
+        mode_key = AUDIO_MODES.get(audio_mode, "audio_description")
+        items = layer_items({"music": music, "ambience": ambience, "voice": voice, "effects": effects},
+                            extra_elements, mode_key)
+        combined_text = delimiter.join(text for _, text, _ in items)
+
+        if not items:
+            message = "Please input at least one audio element / 请至少输入一个音频元素"
+            return ("", message, [message])
+        if not generate_description:
+            return (combined_text, combined_text, [text for _, text, _ in items])
+        if requires_api_key(description_engine) and (not openrouter_api_key or not openrouter_api_key.strip()):
+            error = "Error: OpenRouter API key is required"
+            return (combined_text, error, [error] * len(items))
+
+        temperature, api_seed = sampling_params(deterministic, seed)
+        model = model_override.strip() or None
+
+        def describe(item: Tuple[str, str, str]) -> Tuple[str, bool]:
+            _, text, element_mode = item
+            try:
+                # Unchanged elements are served from the cache, so editing one layer costs one request
+                description, result_mode = describe_text(text, openrouter_api_key, element_mode,
+                                                         engine=description_engine,
+                                                         background=background_refresh, job_owner=unique_id,
+                                                         temperature=temperature, seed=api_seed, model=model)
+            except Exception as e:
+                logging.error(f"Layer description failed: {e}")
+                return text, False
+            if result_mode != "MMAudio":
+                # Error or placeholder: the element's own text stands in for its description
+                return text, False
+            return description, True
+
+        results = run_batch(items, describe, concurrency)
+        layers = [(name, description) for (name, _, _), (description, _) in zip(items, results)]
+        # Merging placeholders would cache a mix that is about to change, so join them locally
+        effective_merge = merge_mode if all(ok for _, ok in results) else MERGE_TEMPLATE
+        audio_description = merge_layer_descriptions(layers, openrouter_api_key, mode_key, effective_merge,
+                                                     delimiter, temperature=temperature, seed=api_seed, model=model)
+        logging.info(f"Layered audio description generated from {len(items)} elements ({effective_merge} merge)")
+        return (combined_text, audio_description, [description for _, description in layers])
+
 NODE_CLASS_MAPPINGS = {
     "StringMultiline": StringMultiline,
     "StringMultilineTranslator": StringMultilineTranslator,
     "StringConcatenateTranslator": StringConcatenateTranslator,
     "StringReplaceTranslator": StringReplaceTranslator,
+    "AudioDescriptionLayerCombiner": AudioDescriptionLayerCombiner,
     "WanVideoToMMAudioBridge": WanVideoToMMAudioBridge,
+    "WanVideoPromptRecorder": WanVideoPromptRecorder,
     "MMAudioPreviewGenerator": MMAudioPreviewGenerator,
+    "MMAudioTimelineGenerator": MMAudioTimelineGenerator,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
@@ -489,6 +1567,9 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "StringMultilineTranslator": "MMAudio Description Generator",
     "StringConcatenateTranslator": "Audio Description Combiner",
     "StringReplaceTranslator": "Audio Description Replacer",
+    "AudioDescriptionLayerCombiner": "Audio Description Layer Combiner",
     "WanVideoToMMAudioBridge": "WanVideo to MMAudio Bridge",
+    "WanVideoPromptRecorder": "WanVideo Prompt Recorder",
     "MMAudioPreviewGenerator": "MMAudio Preview Generator",
+    "MMAudioTimelineGenerator": "MMAudio Timeline Generator",
 }
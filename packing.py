@@ -0,0 +1,89 @@
+"""
+Packed Multi-Item Request Helpers
+Author: eddy
+"""
+
+import json
+import re
+from typing import List, Optional
+
+PACKED_INSTRUCTIONS = """Generate one audio description for each input item below, following the system instructions for every item.
+Return ONLY a JSON array with exactly {count} objects of the form {{"id": <item id>, "description": "<audio description>"}}, one per input id, in the same order. No markdown, no commentary.
+
+Input items:
+{items}"""
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate that errs on the high side for CJK text
+    """
+    return max(1, len(text.encode("utf-8")) // 3)
+
+
+def make_packs(items: List[str], pack_size: int, token_budget: int) -> List[List[int]]:
+    """
+    Group item indices into packs bounded by item count and estimated prompt tokens
+    """
+    packs: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+
+    for index, item in enumerate(items):
+        item_tokens = estimate_tokens(item)
+        if current and (len(current) >= pack_size or (token_budget > 0 and current_tokens + item_tokens > token_budget)):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += item_tokens
+
+    if current:
+        packs.append(current)
+    return packs
+
+
+def build_packed_prompt(items: List[str]) -> str:
+    """
+    Build the user message asking for a strict JSON array of descriptions
+    """
+    payload = json.dumps([{"id": i, "input": item} for i, item in enumerate(items)], ensure_ascii=False)
+    return PACKED_INSTRUCTIONS.format(count=len(items), items=payload)
+
+
+def parse_packed_response(content: str, count: int) -> List[Optional[str]]:
+    """
+    Map a packed response back to its inputs. Entries that are missing or
+    malformed are returned as None so the caller can retry them individually.
+    """
+    results: List[Optional[str]] = [None] * count
+
+    text = _CODE_FENCE.sub("", content.strip())
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end <= start:
+        return results
+
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except ValueError:
+        return results
+    if not isinstance(parsed, list):
+        return results
+
+    # A bare list of strings is only trusted when the item count matches exactly
+    if all(isinstance(entry, str) for entry in parsed):
+        if len(parsed) == count:
+            return [entry.strip() or None for entry in parsed]
+        return results
+
+    for entry in parsed:
+        if not isinstance(entry, dict):
+            continue
+        index, description = entry.get("id"), entry.get("description")
+        if isinstance(index, str) and index.isdigit():
+            index = int(index)
+        if isinstance(index, int) and 0 <= index < count and isinstance(description, str) and description.strip():
+            results[index] = description.strip()
+
+    return results
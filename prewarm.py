@@ -0,0 +1,326 @@
+"""
+Offline Cache Prewarmer
+Author: eddy
+
+Walks saved ComfyUI workflow JSON files (UI or API format), computes the
+effective inputs of the description nodes, including concatenations and
+replacements, and generates their descriptions into the persistent cache.
+
+Usage:
+    python prewarm.py path/to/workflows --api-key sk-or-v1-... --concurrency 8
+"""
+
+import argparse
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+try:
+    from .config import TRANSLATOR_CONFIG
+    from .batch import split_items
+    from .cache import get_response_cache
+    from .lexicon import ENGINE_API, ENGINE_LOCAL
+    from .chunking import LONG_TEXT_MERGED
+    from .timeline import parse_segments
+    from .layers import LAYER_ELEMENTS, layer_items
+    from .replacer import get_replacer
+    from .metrics import current_node
+    from . import nodes
+except ImportError:
+    from config import TRANSLATOR_CONFIG
+    from batch import split_items
+    from cache import get_response_cache
+    from lexicon import ENGINE_API, ENGINE_LOCAL
+    from chunking import LONG_TEXT_MERGED
+    from timeline import parse_segments
+    from layers import LAYER_ELEMENTS, layer_items
+    from replacer import get_replacer
+    from metrics import current_node
+    import nodes
+
+# Node types whose descriptions are prewarmed
+PREWARM_NODE_TYPES = ("StringMultilineTranslator", "StringConcatenateTranslator",
+                      "StringReplaceTranslator", "MMAudioPreviewGenerator", "MMAudioTimelineGenerator",
+                      "AudioDescriptionLayerCombiner")
+
+# Values of the frontend's control_after_generate widget stored after every "seed" widget
+SEED_CONTROL_VALUES = frozenset({"fixed", "increment", "decrement", "randomize"})
+
+# Nodes that are muted (2) or bypassed (4) never run
+INACTIVE_NODE_MODES = frozenset({2, 4})
+
+WIDGET_TYPES = ("STRING", "INT", "FLOAT", "BOOLEAN")
+
+
+def widget_names(node_type: str) -> List[str]:
+    """
+    Names of a node's widget inputs in widgets_values order
+    """
+    input_types = nodes.NODE_CLASS_MAPPINGS[node_type].INPUT_TYPES()
+    names = []
+    for section in ("required", "optional"):
+        for name, spec in input_types.get(section, {}).items():
+            if isinstance(spec[0], list) or spec[0] in WIDGET_TYPES:
+                names.append(name)
+    return names
+
+
+class WorkflowGraph:
+    """Node inputs of a saved workflow with links resolved to upstream string values"""
+
+    def __init__(self, data: dict):
+        self.nodes: Dict[str, dict] = {}
+        self.inputs: Dict[str, Dict[str, object]] = {}
+
+        if isinstance(data.get("nodes"), list):
+            self._load_ui_format(data)
+        else:
+            self._load_api_format(data)
+
+    def _load_ui_format(self, data: dict) -> None:
+        links = {link[0]: (str(link[1]), link[2]) for link in data.get("links") or [] if isinstance(link, list)}
+        for node in data["nodes"]:
+            node_id = str(node["id"])
+            node_type = node.get("type", "")
+            self.nodes[node_id] = {"type": node_type, "active": node.get("mode", 0) not in INACTIVE_NODE_MODES}
+
+            values = node.get("widgets_values")
+            if isinstance(values, dict):
+                inputs = dict(values)
+            elif node_type in nodes.NODE_CLASS_MAPPINGS:
+                inputs = {}
+                position = 0
+                values = list(values or [])
+                for name in widget_names(node_type):
+                    if position >= len(values):
+                        break
+                    inputs[name] = values[position]
+                    position += 1
+                    if name == "seed" and position < len(values) and values[position] in SEED_CONTROL_VALUES:
+                        position += 1
+            else:
+                inputs = {"value": values[0]} if values else {}
+
+            for slot in node.get("inputs") or []:
+                if slot.get("link") is not None and slot["link"] in links:
+                    name = slot.get("widget", {}).get("name") or slot.get("name")
+                    inputs[name] = links[slot["link"]]
+            self.inputs[node_id] = inputs
+
+    def _load_api_format(self, data: dict) -> None:
+        for node_id, node in data.items():
+            if not isinstance(node, dict) or "class_type" not in node:
+                continue
+            self.nodes[str(node_id)] = {"type": node["class_type"], "active": True}
+            self.inputs[str(node_id)] = {
+                name: (str(value[0]), value[1]) if isinstance(value, list) and len(value) == 2 else value
+                for name, value in node.get("inputs", {}).items()
+            }
+
+    def value(self, node_id: str, name: str, default=None, depth: int = 0):
+        """
+        Input value of a node, following links to upstream string outputs; None when unresolvable
+        """
+        value = self.inputs.get(node_id, {}).get(name, default)
+        if isinstance(value, tuple):
+            return self.output(value[0], value[1], depth + 1)
+        return value
+
+    def output(self, node_id: str, slot: int, depth: int = 0) -> Optional[str]:
+        """
+        Text output of an upstream node that can be computed without running it
+        """
+        if depth > 32 or node_id not in self.nodes:
+            return None
+
+        node_type = self.nodes[node_id]["type"]
+        if node_type in ("StringMultiline", "StringMultilineTranslator") and slot == 0:
+            return self.value(node_id, "text", depth=depth)
+        if node_type == "MMAudioPreviewGenerator" and slot == 0:
+            text = self.value(node_id, "text", depth=depth)
+            return text.strip() if isinstance(text, str) else None
+        if slot == 0 and node_type in ("StringConcatenateTranslator", "StringReplaceTranslator"):
+            return effective_text(self, node_id, depth)
+        if node_type == "PrimitiveNode" or node_type.startswith("PrimitiveString"):
+            value = self.value(node_id, "value", depth=depth)
+            return value if isinstance(value, str) else None
+        return None
+
+
+def effective_text(graph: WorkflowGraph, node_id: str, depth: int = 0) -> Optional[str]:
+    """
+    The text a node sends for description, computed the same way the node does
+    """
+    node_type = graph.nodes[node_id]["type"]
+    if node_type == "StringConcatenateTranslator":
+        parts = [graph.value(node_id, name, "", depth) for name in ("string_a", "string_b", "delimiter")]
+        if any(part is None for part in parts):
+            return None
+        string_a, string_b, delimiter = parts
+        return delimiter.join([string_a, string_b])
+    if node_type == "StringReplaceTranslator":
+        parts = [graph.value(node_id, name, "", depth) for name in ("text", "find", "replace", "rules", "rules_file")]
+        if any(part is None for part in parts):
+            return None
+        text, find, replace, rules, rules_file = parts
+        try:
+            return get_replacer(rules, rules_file, find, replace).apply(text)[0]
+        except (OSError, ValueError):
+            return None
+    return graph.value(node_id, "text", "", depth)
+
+
+def collect_jobs(graph: WorkflowGraph) -> Iterator[tuple]:
+    """
+    Yield (text, mode_key, engine, temperature, seed, model, long_text_output, workflow_api_key)
+    per description the workflow's nodes would request
+    """
+    for node_id, node in graph.nodes.items():
+        node_type = node["type"]
+        if node_type not in PREWARM_NODE_TYPES or not node["active"]:
+            continue
+
+        value = lambda name, default=None: graph.value(node_id, name, default)
+        enabled_input = "generate_description" if node_type in ("StringConcatenateTranslator", "StringReplaceTranslator",
+                                                                "AudioDescriptionLayerCombiner") \
+            else "enable_generation"
+        if not value(enabled_input, True):
+            continue
+
+        engine = value("description_engine", ENGINE_API)
+        if engine == ENGINE_LOCAL:
+            continue
+
+        mode_key = nodes.AUDIO_MODES.get(value("audio_mode", "音频描述"), "audio_description")
+        if node_type == "AudioDescriptionLayerCombiner":
+            # Each layer is described in its own mode; the merge step is not prewarmed
+            elements = {name: value(name, "") for name, _ in LAYER_ELEMENTS}
+            elements = {name: text if isinstance(text, str) else "" for name, text in elements.items()}
+            extra = value("extra_elements", "")
+            items = [(text, element_mode) for _, text, element_mode
+                     in layer_items(elements, extra if isinstance(extra, str) else "", mode_key)]
+        else:
+            text = value("segments", "") if node_type == "MMAudioTimelineGenerator" else effective_text(graph, node_id)
+            if not isinstance(text, str) or not text.strip():
+                continue
+            if node_type == "StringReplaceTranslator" and text == graph.value(node_id, "text", ""):
+                # Nothing replaced: the node skips generation
+                continue
+
+            if node_type == "MMAudioTimelineGenerator":
+                try:
+                    texts = [segment["text"] for segment in parse_segments(text) if segment["text"]]
+                except ValueError:
+                    continue
+            elif node_type == "StringMultilineTranslator" and value("batch_mode", False):
+                texts = split_items(text, value("batch_delimiter", "") or "")
+            else:
+                texts = [text]
+            items = [(item, mode_key) for item in texts]
+
+        temperature, seed = nodes.sampling_params(bool(value("deterministic", False)), int(value("seed", 0) or 0))
+        model = (value("model_override", "") or "").strip() or None
+        long_text_output = value("long_text_output", LONG_TEXT_MERGED)
+        api_key = value("openrouter_api_key", "") or ""
+
+        for item, item_mode in items:
+            yield item, item_mode, engine, temperature, seed, model, long_text_output, api_key
+
+
+def find_workflows(paths: List[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(".json"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def prewarm(paths: List[str], api_key: str = "", concurrency: int = 4, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Generate every description the workflows would request into the persistent cache
+    """
+    stats = {"files": 0, "jobs": 0, "cached": 0, "local": 0, "generated": 0, "failed": 0, "skipped": 0}
+
+    jobs: Dict[tuple, str] = {}
+    for path in find_workflows(paths):
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+            graph = WorkflowGraph(data)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.warning(f"Skipping {path}: {e}")
+            continue
+        stats["files"] += 1
+        for *job, workflow_key in collect_jobs(graph):
+            jobs.setdefault(tuple(job), workflow_key)
+    stats["jobs"] = len(jobs)
+
+    cache = get_response_cache()
+    if cache is None:
+        logging.error("The response cache is disabled (TRANSLATOR_CONFIG['enable_cache']), nothing to prewarm")
+        return stats
+
+    pending = []
+    for (text, mode_key, engine, temperature, seed, model, long_text_output), workflow_key in jobs.items():
+        if cache.get(nodes._description_cache_key(text, mode_key, temperature, seed, model)) is not None:
+            stats["cached"] += 1
+        elif engine != ENGINE_API and nodes.describe_locally(text, mode_key) is not None:
+            stats["local"] += 1
+        elif not dry_run and not (api_key or workflow_key).strip():
+            # A key is only needed to actually send the request; dry runs list these too
+            stats["skipped"] += 1
+        else:
+            pending.append((text, mode_key, temperature, seed, model, long_text_output, api_key or workflow_key))
+
+    if dry_run:
+        for text, mode_key, _, _, model, _, _ in pending:
+            print(f"[{mode_key}{'/' + model if model else ''}] {text}")
+        stats["skipped"] += len(pending)
+        return stats
+
+    def generate(job: tuple) -> bool:
+        text, mode_key, temperature, seed, model, long_text_output, key = job
+        _, result_mode = nodes.describe_text(text, key, mode_key, ENGINE_API, long_text_output, stream=False,
+                                             temperature=temperature, seed=seed, model=model)
+        return result_mode == "MMAudio"
+
+    # Metrics attribute the generated calls to the prewarmer rather than a node
+    current_node.set("Prewarmer")
+    context = contextvars.copy_context()
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="mmaudio-prewarm") as executor:
+            for success in executor.map(lambda job: context.copy().run(generate, job), pending):
+                stats["generated" if success else "failed"] += 1
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prewarm the description cache from saved ComfyUI workflows")
+    parser.add_argument("paths", nargs="+", help="Workflow JSON files or directories to scan recursively")
+    parser.add_argument("--api-key", default=os.environ.get("OPENROUTER_API_KEY", ""),
+                        help="OpenRouter API key (default: $OPENROUTER_API_KEY, then the key saved in each workflow)")
+    parser.add_argument("--concurrency", type=int, default=TRANSLATOR_CONFIG["batch_concurrency"])
+    parser.add_argument("--dry-run", action="store_true", help="List uncached descriptions without calling the API")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    started = time.perf_counter()
+    stats = prewarm(args.paths, args.api_key, args.concurrency, args.dry_run)
+    print(
+        f"{stats['files']} workflows, {stats['jobs']} descriptions: {stats['cached']} already cached, "
+        f"{stats['local']} local, {stats['generated']} generated, {stats['failed']} failed, "
+        f"{stats['skipped']} skipped in {time.perf_counter() - started:.1f}s"
+    )
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Per-mode Prompt Registry
+Author: eddy
+"""
+
+import hashlib
+from functools import lru_cache
+from typing import List, Tuple
+
+try:
+    from .config import (PROMPT_HEADER, MODE_PROMPT_EXAMPLES, MODE_PROMPT_FOCUS, PROMPT_PRINCIPLES,
+                         FEW_SHOT_EXAMPLES, PROMPT_REQUIREMENTS, PROMPT_CACHE_HINTS)
+except ImportError:
+    from config import (PROMPT_HEADER, MODE_PROMPT_EXAMPLES, MODE_PROMPT_FOCUS, PROMPT_PRINCIPLES,
+                        FEW_SHOT_EXAMPLES, PROMPT_REQUIREMENTS, PROMPT_CACHE_HINTS)
+
+# Model prefixes whose providers honor explicit cache_control breakpoints
+CACHE_CONTROL_PREFIXES = ("anthropic/", "google/gemini")
+
+
+def supports_cache_control(model: str) -> bool:
+    if PROMPT_CACHE_HINTS == "auto":
+        return model.startswith(CACHE_CONTROL_PREFIXES)
+    return bool(PROMPT_CACHE_HINTS)
+
+
+@lru_cache(maxsize=None)
+def get_system_prompt(mode: str) -> str:
+    """
+    Build the system prompt for a mode: the shared header, only that mode's
+    examples and its focus line. Unknown and general modes use every example.
+    """
+    if mode in MODE_PROMPT_EXAMPLES:
+        title, lines = MODE_PROMPT_EXAMPLES[mode]
+        sections = [PROMPT_HEADER, MODE_PROMPT_FOCUS.get(mode, ""), title + "\n" + "\n".join(lines)]
+    else:
+        sections = [PROMPT_HEADER] + [title + "\n" + "\n".join(lines) for title, lines in MODE_PROMPT_EXAMPLES.values()]
+    sections.append(PROMPT_REQUIREMENTS if mode in MODE_PROMPT_EXAMPLES else PROMPT_PRINCIPLES + "\n\n" + PROMPT_REQUIREMENTS)
+    return "\n\n".join(section for section in sections if section)
+
+
+@lru_cache(maxsize=None)
+def get_few_shot_examples(mode: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Few-shot (input, output) pairs for a mode; the general mode gets all of them
+    """
+    if mode in MODE_PROMPT_EXAMPLES:
+        return tuple((source, target) for source, target, example_mode in FEW_SHOT_EXAMPLES if example_mode == mode)
+    return tuple((source, target) for source, target, _ in FEW_SHOT_EXAMPLES)
+
+
+@lru_cache(maxsize=None)
+def get_prompt_fingerprint(mode: str) -> str:
+    """
+    Short hash of the static prompt prefix, used in cache keys
+    """
+    prefix = get_system_prompt(mode) + "".join(source + target for source, target in get_few_shot_examples(mode))
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def _static_prefix(mode: str, cache_hints: bool) -> Tuple[dict, ...]:
+    if cache_hints:
+        # The breakpoint sits on the last static message so the whole prefix is cacheable
+        system_message = {"role": "system", "content": [{"type": "text", "text": get_system_prompt(mode)}]}
+    else:
+        system_message = {"role": "system", "content": get_system_prompt(mode)}
+
+    messages = [system_message]
+    for source, target in get_few_shot_examples(mode):
+        messages.append({"role": "user", "content": source})
+        messages.append({"role": "assistant", "content": target})
+
+    if cache_hints:
+        last = messages[-1]
+        last_text = last["content"] if isinstance(last["content"], str) else last["content"][0]["text"]
+        messages[-1] = {
+            "role": last["role"],
+            "content": [{"type": "text", "text": last_text, "cache_control": {"type": "ephemeral"}}],
+        }
+    return tuple(messages)
+
+
+def build_messages(mode: str, user_content: str, model: str) -> List[dict]:
+    """
+    Chat messages for a request: the byte-identical static prefix for the mode
+    followed by the user content
+    """
+    prefix = _static_prefix(mode, supports_cache_control(model))
+    return list(prefix) + [{"role": "user", "content": user_content}]
@@ -0,0 +1,112 @@
+"""
+Process-wide Rate Limiting
+Author: eddy
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a fixed rate"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        Take amount tokens and return how long the caller must wait before using them
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            self._refill(time.monotonic())
+            # Requests larger than the bucket are clamped so they can still run
+            amount = min(amount, self.capacity)
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class AdaptiveRateLimiter:
+    """
+    Global limiter combining a requests-per-second bucket, a tokens-per-minute
+    bucket and an AIMD concurrency window driven by 429 responses
+    """
+
+    def __init__(self, requests_per_second: float, tokens_per_minute: float,
+                 max_concurrency: int, min_concurrency: int = 1,
+                 increase_step: float = 1.0, decrease_factor: float = 0.5):
+        self.request_bucket = TokenBucket(requests_per_second, max(1.0, requests_per_second))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60.0, max(1.0, tokens_per_minute))
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def concurrency_limit(self) -> int:
+        return max(self.min_concurrency, int(self._limit))
+
+    def acquire(self, estimated_tokens: int = 0) -> None:
+        """
+        Block until a request may be sent, then occupy one concurrency slot
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    self._condition.wait(self._blocked_until - now)
+                elif self._in_flight >= self.concurrency_limit:
+                    self._condition.wait()
+                else:
+                    break
+            self._in_flight += 1
+
+        delay = max(self.request_bucket.reserve(1.0), self.token_bucket.reserve(estimated_tokens))
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self, success: bool = True, rate_limited: bool = False, retry_after: Optional[float] = None) -> None:
+        """
+        Free a concurrency slot and adapt the window: additive increase on success,
+        multiplicative decrease on 429, unchanged on other failures
+        """
+        with self._condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            if rate_limited:
+                self._limit = max(float(self.min_concurrency), self._limit * self.decrease_factor)
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            elif success:
+                # Grow by roughly increase_step per window of successful requests
+                self._limit = min(float(self.max_concurrency), self._limit + self.increase_step / max(1.0, self._limit))
+            self._condition.notify_all()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given in seconds (HTTP dates are ignored)
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
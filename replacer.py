@@ -0,0 +1,167 @@
+"""
+Multi-rule Single-pass Replacement
+Author: eddy
+
+Rule tables have one rule per line:
+
+    Anna => Marie
+    re:piano(s?) => violin\\1
+    # comments and blank lines are ignored
+
+"find<TAB>replace" lines work as well, so spreadsheet columns can be pasted directly.
+A .json rules file holds either {"find": "replace"} or
+[{"find": ..., "replace": ..., "regex": false}].
+"""
+
+import functools
+import json
+import os
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+REGEX_PREFIX = "re:"
+
+# Backreferences inside a find pattern would point at the wrong group once rules are combined
+_PATTERN_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+class ReplaceRule(NamedTuple):
+    find: str
+    replace: str
+    regex: bool = False
+
+
+def parse_rules(text: str, source: str = "rules") -> List[ReplaceRule]:
+    """
+    Parse a rule table in line format; raises ValueError naming the bad line
+    """
+    rules = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        separator = "=>" if "=>" in line else "\t"
+        if separator not in line:
+            raise ValueError(f"{source} line {number}: expected 'find => replace'")
+        find, replace = line.split(separator, 1)
+        find, replace = find.strip(), replace.strip()
+        regex = find.startswith(REGEX_PREFIX)
+        if regex:
+            find = find[len(REGEX_PREFIX):]
+        if not find:
+            raise ValueError(f"{source} line {number}: empty find pattern")
+        rules.append(ReplaceRule(find, replace, regex))
+    return rules
+
+
+def resolve_rules_path(path: str) -> str:
+    """
+    Relative rules file paths are tried from the working directory, then the plugin directory
+    """
+    path = path.strip()
+    if path and not os.path.isabs(path) and not os.path.exists(path):
+        plugin_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        if os.path.exists(plugin_path):
+            return plugin_path
+    return path
+
+
+def rules_file_stamp(path: str) -> Optional[float]:
+    """
+    Modification time of a rules file, None when it is missing
+    """
+    try:
+        return os.path.getmtime(resolve_rules_path(path)) if path.strip() else None
+    except OSError:
+        return None
+
+
+def load_rules_file(path: str) -> List[ReplaceRule]:
+    """
+    Load rules from a line-format or .json file
+    """
+    path = resolve_rules_path(path)
+    with open(path, "r", encoding="utf-8") as handle:
+        content = handle.read()
+
+    if not path.lower().endswith(".json"):
+        return parse_rules(content, os.path.basename(path))
+
+    data = json.loads(content)
+    if isinstance(data, dict):
+        return [ReplaceRule(str(find), str(replace)) for find, replace in data.items() if find]
+    if not isinstance(data, list):
+        raise ValueError(f"{os.path.basename(path)}: expected an object or a list of rules")
+    return [
+        ReplaceRule(str(entry["find"]), str(entry.get("replace", "")), bool(entry.get("regex", False)))
+        for entry in data if isinstance(entry, dict) and entry.get("find")
+    ]
+
+
+class MultiReplacer:
+    """
+    All rules compiled into one alternation and applied in a single left-to-right scan,
+    so replaced text is never matched again by later rules. At one position, regex rules
+    win in table order, then literal rules longest first.
+    """
+
+    def __init__(self, rules: List[ReplaceRule]):
+        regex_rules = [rule for rule in rules if rule.regex]
+        literal_rules = sorted((rule for rule in rules if not rule.regex), key=lambda rule: -len(rule.find))
+        self.rules = regex_rules + literal_rules
+        self._rule_patterns = []
+        alternatives = []
+        for index, rule in enumerate(self.rules):
+            try:
+                pattern = re.compile(rule.find if rule.regex else re.escape(rule.find))
+            except re.error as e:
+                raise ValueError(f"Invalid regex {rule.find!r}: {e}")
+            if rule.regex and _PATTERN_BACKREFERENCE.search(rule.find):
+                raise ValueError(f"Backreferences are not supported in find patterns: {rule.find!r}")
+            if pattern.fullmatch(""):
+                raise ValueError(f"Pattern {rule.find!r} matches empty text")
+            self._rule_patterns.append(pattern)
+            alternatives.append(f"(?P<r{index}>{pattern.pattern})")
+        try:
+            self._pattern = re.compile("|".join(alternatives)) if alternatives else None
+        except re.error as e:
+            raise ValueError(f"Rules cannot be combined: {e}")
+
+    def apply(self, text: str) -> Tuple[str, int]:
+        """
+        Return (replaced text, number of replacements)
+        """
+        if self._pattern is None:
+            return text, 0
+
+        count = 0
+
+        def substitute(match) -> str:
+            nonlocal count
+            count += 1
+            index = int(match.lastgroup[1:])
+            rule = self.rules[index]
+            if not rule.regex:
+                return rule.replace
+            # Re-match the rule alone so its own group numbers apply to the replacement
+            inner = self._rule_patterns[index].fullmatch(match.group(0))
+            return inner.expand(rule.replace) if inner else match.group(0)
+
+        return self._pattern.sub(substitute, text), count
+
+
+@functools.lru_cache(maxsize=64)
+def _compile(rules_text: str, rules_file: str, file_stamp: Optional[float], find: str, replace: str) -> MultiReplacer:
+    rules = [ReplaceRule(find, replace)] if find else []
+    rules += parse_rules(rules_text)
+    if rules_file:
+        rules += load_rules_file(rules_file)
+    return MultiReplacer(rules)
+
+
+def get_replacer(rules_text: str = "", rules_file: str = "", find: str = "", replace: str = "") -> MultiReplacer:
+    """
+    Compiled replacer for a rule table, a rules file and a single find/replace pair,
+    reused until any of them (or the file's modification time) changes
+    """
+    rules_file = rules_file.strip()
+    return _compile(rules_text, rules_file, rules_file_stamp(rules_file), find, replace)
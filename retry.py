@@ -0,0 +1,60 @@
+"""
+Retry and Hedging Policies
+Author: eddy
+"""
+
+import random
+import threading
+from collections import deque
+from typing import Optional
+
+# HTTP status codes worth retrying: rate limiting and upstream failures
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for retryable failures"""
+
+    def __init__(self, retry_count: int, backoff_base: float, backoff_max: float):
+        self.retry_count = max(0, retry_count)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @staticmethod
+    def is_retryable_status(status_code: int) -> bool:
+        return status_code in RETRYABLE_STATUS_CODES
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Seconds to wait before retry number attempt + 1; a server Retry-After takes precedence
+        """
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            return max(backoff, min(retry_after, self.backoff_max))
+        return backoff
+
+
+class LatencyTracker:
+    """Rolling window of request latencies used to pick the hedging delay"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Return the given percentile (0-100) of recorded latencies, or None without samples
+        """
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(percentile / 100.0 * (len(ordered) - 1)))))
+        return ordered[index]
@@ -0,0 +1,252 @@
+"""
+Latency-aware Endpoint Router
+Author: eddy
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+try:
+    from .config import OPENROUTER_CONFIG, ROUTER_CONFIG
+    from .client import get_client, RETRYABLE_EXCEPTIONS
+    from .breaker import get_circuit_breaker, CircuitOpenError
+    from .aclient import get_async_client
+except ImportError:
+    from config import OPENROUTER_CONFIG, ROUTER_CONFIG
+    from client import get_client, RETRYABLE_EXCEPTIONS
+    from breaker import get_circuit_breaker, CircuitOpenError
+    from aclient import get_async_client
+
+# A bad request is wrong for every target, so it is returned instead of failing over
+NON_FAILOVER_STATUS_CODES = frozenset({400})
+
+
+class RouteTarget:
+    """One endpoint and model pair with its latency and error estimates"""
+
+    def __init__(self, name: str, base_url: str, model: str, api_key: str = ""):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+
+    def __repr__(self) -> str:
+        return f"RouteTarget({self.name!r}, {self.model!r})"
+
+
+class LatencyRouter:
+    """Ranks targets by EWMA latency weighted by EWMA error rate; failing targets cool down"""
+
+    def __init__(self, targets: List[RouteTarget], alpha: float = 0.3, error_penalty: float = 4.0,
+                 failure_cooldown: float = 30.0, probe_interval: float = 60.0):
+        if not targets:
+            raise ValueError("LatencyRouter needs at least one target")
+        self.targets = targets
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.failure_cooldown = failure_cooldown
+        self.probe_interval = probe_interval
+        self._override_targets: Dict[str, RouteTarget] = {}
+        self._lock = threading.Lock()
+
+    def _score(self, target: RouteTarget, now: float) -> float:
+        # Untried targets and estimates older than probe_interval go first so they get measured
+        if target.latency is None or (self.probe_interval > 0 and now - target.last_used > self.probe_interval):
+            return 0.0
+        return target.latency * (1.0 + self.error_penalty * target.error_rate)
+
+    def candidates(self, model: Optional[str] = None) -> List[RouteTarget]:
+        """
+        Targets in the order to try them: healthy ones fastest first, then cooling ones.
+        With a model override only targets serving that model are used; if none is
+        configured, OPENROUTER_CONFIG's endpoint is used with the overridden model.
+        """
+        now = time.monotonic()
+        with self._lock:
+            pool = self.targets
+            if model:
+                pool = [target for target in self.targets if target.model == model]
+                if not pool:
+                    override = self._override_targets.get(model)
+                    if override is None:
+                        override = RouteTarget(model, OPENROUTER_CONFIG["base_url"], model)
+                        self._override_targets[model] = override
+                    pool = [override]
+
+            healthy = sorted((t for t in pool if t.cooldown_until <= now), key=lambda t: self._score(t, now))
+            cooling = sorted((t for t in pool if t.cooldown_until > now), key=lambda t: t.cooldown_until)
+        return healthy + cooling
+
+    def record(self, target: RouteTarget, latency: Optional[float], success: bool) -> None:
+        """
+        Update a target's estimates after a request; repeated failures back off the cooldown
+        """
+        now = time.monotonic()
+        with self._lock:
+            target.last_used = now
+            target.error_rate += self.alpha * ((0.0 if success else 1.0) - target.error_rate)
+            if success:
+                target.consecutive_failures = 0
+                target.cooldown_until = 0.0
+                if latency is not None:
+                    target.latency = latency if target.latency is None else target.latency + self.alpha * (latency - target.latency)
+            else:
+                target.consecutive_failures += 1
+                target.cooldown_until = now + self.failure_cooldown * min(2 ** (target.consecutive_failures - 1), 8)
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "name": target.name,
+                    "model": target.model,
+                    "latency": target.latency,
+                    "error_rate": target.error_rate,
+                    "healthy": target.cooldown_until <= now,
+                }
+                for target in self.targets + list(self._override_targets.values())
+            ]
+
+
+def post_routed_chat(payload: dict, api_key: str, stream: bool = False, model: Optional[str] = None,
+                     messages_for: Optional[Callable[[str], List[dict]]] = None) -> requests.Response:
+    """
+    Send a chat request to the fastest healthy target, failing over to the next one on
+    network errors and error statuses. Only the last candidate retries with backoff.
+    messages_for(target_model) rebuilds the messages for each target, so model specific
+    formatting (prompt cache hints) matches the model that receives the request.
+    Targets whose endpoint circuit is open are skipped; CircuitOpenError is raised
+    without sending anything when every candidate is open.
+    The target that answered is attached as response.target.
+    """
+    router = get_router()
+    client = get_client()
+    candidates = router.candidates(model)
+    skipped = []
+
+    for position, target in enumerate(candidates):
+        is_last = position == len(candidates) - 1
+        breaker = get_circuit_breaker(target.base_url)
+        if breaker is not None and not breaker.allow():
+            skipped.append(target.name)
+            continue
+
+        routed_payload = dict(payload, model=target.model)
+        if messages_for is not None:
+            routed_payload["messages"] = messages_for(target.model)
+        try:
+            response = client.post_chat(routed_payload, target.api_key or api_key, stream=stream,
+                                        base_url=target.base_url, retry=is_last, breaker=breaker)
+        except RETRYABLE_EXCEPTIONS as e:
+            router.record(target, None, False)
+            if is_last:
+                raise
+            logging.warning(f"Route {target.name} failed ({e}), failing over")
+            continue
+        except BaseException:
+            if breaker is not None:
+                breaker.abandon()
+            raise
+
+        success = response.status_code < 400
+        router.record(target, response.timings.get("ttfb"), success)
+        if not success and not is_last and response.status_code not in NON_FAILOVER_STATUS_CODES:
+            logging.warning(f"Route {target.name} returned {response.status_code}, failing over")
+            response.close()
+            continue
+
+        response.target = target
+        return response
+
+    raise CircuitOpenError(f"Circuit open for {', '.join(skipped)}, not sending request")
+
+
+async def post_routed_chat_async(payload: dict, api_key: str, model: Optional[str] = None,
+                                  messages_for: Optional[Callable[[str], List[dict]]] = None):
+    """
+    post_routed_chat for the asyncio path: the same target ranking, failover and circuit
+    breakers, sent through the event loop's HTTP/2 client. Streaming is not supported.
+    """
+    router = get_router()
+    client = get_async_client()
+    candidates = router.candidates(model)
+    skipped = []
+
+    for position, target in enumerate(candidates):
+        is_last = position == len(candidates) - 1
+        breaker = get_circuit_breaker(target.base_url)
+        if breaker is not None and not breaker.allow():
+            skipped.append(target.name)
+            continue
+
+        routed_payload = dict(payload, model=target.model)
+        if messages_for is not None:
+            routed_payload["messages"] = messages_for(target.model)
+        try:
+            response = await client.post_chat(routed_payload, target.api_key or api_key,
+                                              base_url=target.base_url, retry=is_last, breaker=breaker)
+        except RETRYABLE_EXCEPTIONS as e:
+            router.record(target, None, False)
+            if is_last:
+                raise
+            logging.warning(f"Route {target.name} failed ({e}), failing over")
+            continue
+        except BaseException:
+            if breaker is not None:
+                breaker.abandon()
+            raise
+
+        success = response.status_code < 400
+        router.record(target, response.timings.get("ttfb"), success)
+        if not success and not is_last and response.status_code not in NON_FAILOVER_STATUS_CODES:
+            logging.warning(f"Route {target.name} returned {response.status_code}, failing over")
+            continue
+
+        response.target = target
+        return response
+
+    raise CircuitOpenError(f"Circuit open for {', '.join(skipped)}, not sending request")
+
+
+_router_instance = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LatencyRouter:
+    """
+    Return the process-wide router; without configured targets it routes to
+    OPENROUTER_CONFIG's endpoint and model only
+    """
+    global _router_instance
+
+    if _router_instance is None:
+        with _router_lock:
+            if _router_instance is None:
+                targets = [
+                    RouteTarget(
+                        entry.get("name") or entry["model"],
+                        entry.get("base_url") or OPENROUTER_CONFIG["base_url"],
+                        entry["model"],
+                        entry.get("api_key", ""),
+                    )
+                    for entry in ROUTER_CONFIG["targets"]
+                ] or [RouteTarget("default", OPENROUTER_CONFIG["base_url"], OPENROUTER_CONFIG["model"])]
+                _router_instance = LatencyRouter(
+                    targets,
+                    ROUTER_CONFIG["ewma_alpha"],
+                    ROUTER_CONFIG["error_penalty"],
+                    ROUTER_CONFIG["failure_cooldown"],
+                    ROUTER_CONFIG["probe_interval"],
+                )
+
+    return _router_instance
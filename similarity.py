@@ -0,0 +1,261 @@
+"""
+Near-duplicate Prompt Index
+Author: eddy
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+try:
+    from .config import SIMILARITY_CONFIG, TRANSLATOR_CONFIG
+    from .metrics import record_similarity_lookup
+except ImportError:
+    from config import SIMILARITY_CONFIG, TRANSLATOR_CONFIG
+    from metrics import record_similarity_lookup
+
+_PUNCTUATION = re.compile(r"[^\w\s]+", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+", re.UNICODE)
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_text(text: str) -> str:
+    """
+    Fold width variants (NFKC), case, punctuation and whitespace so trivially
+    different prompts compare equal
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def shingles(text: str, size: int) -> FrozenSet[str]:
+    """
+    Character n-grams of normalized text; spaces are kept so word boundaries count
+    """
+    if len(text) <= size:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + size] for i in range(len(text) - size + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over character n-grams returning stored descriptions for similar prompts.
+    Entries older than expire_time seconds are never returned, matching the response cache TTL.
+    Every lookup is a miss until ready is set, so the index can be seeded in the background.
+    """
+
+    def __init__(self, threshold: float, ngram: int, num_perm: int, bands: int, max_entries: int,
+                 expire_time: float = 0):
+        self.threshold = threshold
+        self.ngram = ngram
+        self.bands = bands
+        self.rows = max(1, num_perm // bands)
+        self.max_entries = max_entries
+        self.expire_time = expire_time
+
+        generator = random.Random(0x5EED)
+        self._permutations = [
+            (generator.randrange(1, _MERSENNE_PRIME), generator.randrange(0, _MERSENNE_PRIME))
+            for _ in range(self.bands * self.rows)
+        ]
+        # (namespace, normalized text) -> (n-grams, value, signature, created)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[FrozenSet[str], str, Tuple[int, ...], float]]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], Set[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self.ready = threading.Event()
+        self.ready.set()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _signature(self, grams: FrozenSet[str]) -> Tuple[int, ...]:
+        hashes = [hash(gram) & _MAX_HASH for gram in grams]
+        return tuple(
+            min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashes)
+            for a, b in self._permutations
+        )
+
+    def _band_keys(self, namespace: str, signature: Tuple[int, ...]) -> List[Tuple[str, int, Tuple[int, ...]]]:
+        return [
+            (namespace, band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.expire_time > 0 and now - created > self.expire_time
+
+    def _remove_locked(self, entry_key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(entry_key[0], entry[2]):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(entry_key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def add(self, namespace: str, text: str, value: str, created: Optional[float] = None) -> None:
+        normalized = normalize_text(text)
+        grams = shingles(normalized, self.ngram)
+        if not grams:
+            return
+
+        signature = self._signature(grams)
+        entry_key = (namespace, normalized)
+        entry = (grams, value, signature, time.time() if created is None else created)
+        with self._lock:
+            if entry_key in self._entries:
+                # Seeding from older cache rows must not replace a newer description
+                if created is not None and self._entries[entry_key][3] > created:
+                    return
+                self._entries.move_to_end(entry_key)
+                self._entries[entry_key] = entry
+                return
+
+            self._entries[entry_key] = entry
+            for band_key in self._band_keys(namespace, signature):
+                self._buckets.setdefault(band_key, set()).add(entry_key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove_locked(next(iter(self._entries)))
+
+    def discard(self, namespace: str, text: str) -> None:
+        """
+        Drop the entry of a prompt, e.g. after the response cache evicted it
+        """
+        with self._lock:
+            self._remove_locked((namespace, normalize_text(text)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def lookup(self, namespace: str, text: str) -> Optional[str]:
+        """
+        Return the stored value of the most similar prompt above the threshold, or None
+        """
+        if not self.ready.is_set():
+            with self._lock:
+                self.misses += 1
+            record_similarity_lookup(False)
+            return None
+
+        normalized = normalize_text(text)
+        grams = shingles(normalized, self.ngram)
+        if not grams:
+            return None
+
+        now = time.time()
+        exact_value = None
+        with self._lock:
+            exact = self._entries.get((namespace, normalized))
+            if exact is not None:
+                if self._expired(exact[3], now):
+                    self._remove_locked((namespace, normalized))
+                else:
+                    self.hits += 1
+                    exact_value = exact[1]
+        if exact_value is not None:
+            record_similarity_lookup(True)
+            return exact_value
+
+        signature = self._signature(grams)
+        best_value, best_score = None, self.threshold
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(namespace, signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            expired = []
+            for candidate in candidates:
+                candidate_grams, value, _, created = self._entries[candidate]
+                if self._expired(created, now):
+                    expired.append(candidate)
+                    continue
+                score = jaccard(grams, candidate_grams)
+                if score >= best_score:
+                    best_value, best_score = value, score
+            for candidate in expired:
+                self._remove_locked(candidate)
+
+            if best_value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_similarity_lookup(best_value is not None)
+        return best_value
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_index_instance = None
+_index_lock = threading.Lock()
+
+
+def _seed_index(index: NearDuplicateIndex, cache) -> None:
+    try:
+        loaded = 0
+        for namespace, text, value, created in cache.entries():
+            if namespace and text:
+                index.add(namespace, text, value, created)
+                loaded += 1
+        logging.info(f"Near-duplicate index loaded {loaded} cached prompts")
+    except Exception as e:
+        logging.error(f"Near-duplicate index could not be seeded from the cache: {e}")
+    finally:
+        index.ready.set()
+
+
+def get_similarity_index(cache=None) -> Optional[NearDuplicateIndex]:
+    """
+    Return the process-wide near-duplicate index, or None when disabled. On first use it
+    is seeded from the persistent cache on a background thread, since hashing a full
+    cache takes seconds; lookups are misses until that has finished.
+    """
+    global _index_instance
+
+    if not SIMILARITY_CONFIG["enabled"]:
+        return None
+
+    if _index_instance is None:
+        with _index_lock:
+            if _index_instance is None:
+                index = NearDuplicateIndex(
+                    SIMILARITY_CONFIG["threshold"],
+                    SIMILARITY_CONFIG["ngram"],
+                    SIMILARITY_CONFIG["num_perm"],
+                    SIMILARITY_CONFIG["bands"],
+                    SIMILARITY_CONFIG["max_entries"],
+                    TRANSLATOR_CONFIG["cache_expire_time"],
+                )
+                if cache is not None:
+                    # Evicted or cleared cache rows leave the index as well
+                    cache.add_listener(index)
+                    index.ready.clear()
+                    threading.Thread(target=_seed_index, args=(index, cache),
+                                     name="mmaudio-similarity-seed", daemon=True).start()
+                _index_instance = index
+
+    return _index_instance
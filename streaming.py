@@ -0,0 +1,137 @@
+"""
+Streaming (SSE) Completion Helpers
+Author: eddy
+"""
+
+import json
+import re
+import socket
+import threading
+from typing import Callable, Iterator, Optional
+
+_SENTENCE_END = re.compile(r"[.!?。！？](?:[\"'”’)\]]*)(?:\s|$)")
+
+
+def iter_sse_deltas(response, usage: Optional[dict] = None) -> Iterator[str]:
+    """
+    Yield content deltas from an OpenAI-compatible text/event-stream response.
+    The usage block of the final chunk (stream_options.include_usage) is copied into usage.
+    """
+    for raw_line in response.iter_lines():
+        if not raw_line:
+            continue
+        line = raw_line.decode("utf-8", errors="replace") if isinstance(raw_line, bytes) else raw_line
+        # Lines starting with ":" are SSE comments (keep-alive / processing notices)
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        if "error" in chunk:
+            raise ValueError(f"Stream error: {chunk['error']}")
+        if usage is not None and chunk.get("usage"):
+            usage.update(chunk["usage"])
+        for choice in chunk.get("choices") or []:
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+def complete_prefix(text: str, max_words: int) -> Optional[str]:
+    """
+    Return the finished description if text already contains one (ended by a newline,
+    a sentence end, or the word budget), otherwise None
+    """
+    stripped = text.lstrip()
+    if not stripped:
+        return None
+
+    newline = stripped.find("\n")
+    if newline != -1:
+        return stripped[:newline].strip()
+
+    match = _SENTENCE_END.search(stripped)
+    if match:
+        return stripped[:match.end()].strip()
+
+    words = stripped.split()
+    # The last word may still be growing, so only cut once a further word has started
+    if max_words > 0 and len(words) > max_words:
+        return " ".join(words[:max_words])
+
+    return None
+
+
+def _drain_stream(response, deltas: Iterator[str], timeout: float) -> None:
+    """
+    Read the rest of a stream on a helper thread for at most timeout seconds, then cut
+    the connection; the helper closes the response once its read returns
+    """
+    def drain():
+        try:
+            for _ in deltas:
+                pass
+        except Exception:
+            # The connection is shut down under the reader once the wait is over
+            pass
+        finally:
+            response.close()
+
+    reader = threading.Thread(target=drain, name="mmaudio-stream-usage", daemon=True)
+    reader.start()
+    reader.join(timeout)
+    if reader.is_alive():
+        _shutdown_connection(response)
+
+
+def _shutdown_connection(response) -> None:
+    """
+    Wake a read blocked on the response's socket. Closing the response from another
+    thread would wait for that read to return on its own.
+    """
+    connection = getattr(getattr(response, "raw", None), "connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def read_streamed_description(response, max_words: int,
+                              on_partial: Optional[Callable[[str], None]] = None,
+                              usage: Optional[dict] = None, usage_wait: float = 0.0) -> str:
+    """
+    Accumulate a streamed completion, stopping as soon as a complete description has arrived.
+    With usage, the caller waits at most usage_wait seconds after that for the final usage
+    chunk before the connection is closed.
+    """
+    text = ""
+    # Filled by the reader; copied out only once it is done or given up on, so a late
+    # usage chunk never changes usage after this returns
+    stream_usage = {}
+    deltas = iter_sse_deltas(response, stream_usage)
+    draining = False
+    try:
+        for delta in deltas:
+            text += delta
+            if on_partial is not None:
+                on_partial(text.strip())
+            finished = complete_prefix(text, max_words)
+            if finished is not None:
+                if usage is not None and usage_wait > 0:
+                    draining = True
+                    _drain_stream(response, deltas, usage_wait)
+                    usage.update(dict(stream_usage))
+                return finished
+        if usage is not None:
+            usage.update(stream_usage)
+    finally:
+        # Closing drops the connection so the upstream stops generating
+        if not draining:
+            response.close()
+    return text.strip()
@@ -0,0 +1,111 @@
+"""
+Timeline Segment Parsing
+Author: eddy
+"""
+
+import json
+import re
+from typing import List, Optional
+
+# 01:02:03,500 / 02:03.5 / 3.5 / 3.5s
+_TIMESTAMP = r"(?:\d+:)?(?:\d+:)?\d+(?:[.,]\d+)?s?"
+
+# SRT timing line: 00:00:01,000 --> 00:00:03,500
+_SRT_TIMING = re.compile(rf"^\s*({_TIMESTAMP})\s*-->\s*({_TIMESTAMP})\s*$")
+
+# One-line segment: [0:00-0:03] text / 0:00 - 0:03 text / 1.5-4: text
+_LINE_SEGMENT = re.compile(rf"^\s*\[?\s*({_TIMESTAMP})\s*(?:-->|-|–|~)\s*({_TIMESTAMP})\s*\]?\s*[:：|]?\s*(.+?)\s*$")
+
+
+def parse_timestamp(value) -> float:
+    """
+    Seconds from a number or an [hh:]mm:ss[.mmm] / ss[,mmm] timestamp string
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().rstrip("s").replace(",", ".")
+    seconds = 0.0
+    for part in text.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def _segment(start, end, text: str) -> dict:
+    start_seconds, end_seconds = parse_timestamp(start), parse_timestamp(end)
+    if end_seconds < start_seconds:
+        raise ValueError(f"Segment ends before it starts: {start} -> {end}")
+    return {"start": start_seconds, "end": end_seconds, "text": text.strip()}
+
+
+def _parse_json(data) -> List[dict]:
+    if isinstance(data, dict):
+        data = data.get("segments", data.get("timeline"))
+    if not isinstance(data, list):
+        raise ValueError("JSON timeline must be a list of segments or an object with a 'segments' list")
+
+    segments = []
+    for index, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Segment {index + 1} is not an object")
+        text = entry.get("text", entry.get("prompt", entry.get("description", "")))
+        if "end" not in entry and "duration" in entry:
+            end = parse_timestamp(entry.get("start", 0)) + parse_timestamp(entry["duration"])
+        else:
+            end = entry.get("end", entry.get("start", 0))
+        segments.append(_segment(entry.get("start", 0), end, str(text)))
+    return segments
+
+
+def _parse_lines(text: str) -> List[dict]:
+    segments = []
+    lines = text.splitlines()
+    index = 0
+    while index < len(lines):
+        line = lines[index].strip()
+        index += 1
+        if not line or (line.isdigit() and index < len(lines) and _SRT_TIMING.match(lines[index])):
+            # Blank line or SRT sequence number
+            continue
+
+        timing = _SRT_TIMING.match(line)
+        if timing:
+            # SRT block: the text runs until the next blank line
+            block = []
+            while index < len(lines) and lines[index].strip():
+                block.append(lines[index].strip())
+                index += 1
+            segments.append(_segment(timing.group(1), timing.group(2), " ".join(block)))
+            continue
+
+        match = _LINE_SEGMENT.match(line)
+        if not match:
+            raise ValueError(f"Cannot parse timeline line {index}: {line}")
+        segments.append(_segment(match.group(1), match.group(2), match.group(3)))
+    return segments
+
+
+def parse_segments(text: str) -> List[dict]:
+    """
+    Parse a timeline given as JSON, SRT blocks or "start - end text" lines into
+    [{"start": seconds, "end": seconds, "text": str}] sorted by start time
+    """
+    stripped = text.strip()
+    if not stripped:
+        return []
+    if stripped[0] in "[{":
+        try:
+            data: Optional[object] = json.loads(stripped)
+        except ValueError:
+            data = None
+        if data is not None:
+            segments = _parse_json(data)
+            return sorted(segments, key=lambda segment: segment["start"])
+    return sorted(_parse_lines(stripped), key=lambda segment: segment["start"])
+
+
+def format_timestamp(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:06.3f}"
+    return f"{minutes:02d}:{seconds:06.3f}"